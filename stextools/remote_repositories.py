@@ -1,14 +1,18 @@
+from __future__ import annotations
+
 import functools
 import os
 import subprocess
 from pathlib import Path
-from typing import Optional
-
-import gitlab
-from gitlab.v4.objects import Group
+from typing import Optional, TYPE_CHECKING
 
 from stextools.stepper.interface import interface
 
+if TYPE_CHECKING:
+    # python-gitlab is only needed for cloning, and importing it takes a while (it pulls in requests, urllib3, ...)
+    import gitlab
+    from gitlab.v4.objects import Group
+
 
 @functools.cache
 def get_mathhub_path() -> Path:
@@ -25,22 +29,27 @@ def get_mathhub_path() -> Path:
     return path
 
 
+@functools.lru_cache(maxsize=2**12)   # recursive, so the lookups for files in the same directories are shared
 def get_containing_archive(path: Path) -> Optional[Path]:
-    while path and not (path / '.git').exists():
-        path = path.parent
-    if path:
+    if (path / '.git').exists():
         return path
-    return None
+    if path.parent == path:   # reached the root
+        return None
+    return get_containing_archive(path.parent)
 
 
 
 URL = 'https://gl.mathhub.info'
 
 
-gl: gitlab.Gitlab = gitlab.Gitlab(URL)
+@functools.cache
+def get_gitlab() -> gitlab.Gitlab:
+    import gitlab
+    return gitlab.Gitlab(URL)
 
 
 def clone_group(group: Group | str, recurse: bool = True, use_ssh: bool = True):
+    gl = get_gitlab()
     if isinstance(group, str):
         group = gl.groups.get(group)
     # TODO: deal properly with pagination (also below for subgroups)
@@ -56,6 +65,8 @@ def clone_group(group: Group | str, recurse: bool = True, use_ssh: bool = True):
 
         url = project.ssh_url_to_repo if use_ssh else project.http_url_to_repo
         subprocess.run(['git', 'clone', url], check=True, cwd=directory.parent)
+        # paths in the new archive may have been cached as not belonging to an archive
+        get_containing_archive.cache_clear()
 
     if recurse:
         groups = group.subgroups.list(per_page=1000)
@@ -1,6 +1,7 @@
 """
 Various helper functions for displaying snify content.
 """
+import functools
 import re
 
 from stextools.config import get_config
@@ -10,13 +11,26 @@ from stextools.stepper.interface import interface, BrowserInterface
 from stextools.stex.local_stex import FlamsUri
 
 
+@functools.cache
+def get_display_context_lines() -> int:
+    return get_config().getint('stextools.snify', 'display_context_lines', fallback=5)
+
+
+@functools.cache
+def _strip_html_style_attrs() -> bool:
+    return get_config().getboolean('stextools.snify', 'strip_html_style_attrs', fallback=False)
+
+
 def display_snify_header(state: SnifyState):
     # TODO: add:
     #   * current annotation type
     #   * statistics (# annos, remaining/total documents, ...)
-    interface.write_header(state.get_current_document().identifier)
+    doc = state.get_current_document()
+    n_docs = str(len(state.documents))
+    interface.write_header(doc.identifier)
     interface.write_statistics(
-        f'{str(state.cursor.document_index + 1).rjust(len(str(len(state.documents))))}/{len(state.documents)}   {state.get_current_document().format}:{state.get_current_document().language.upper()}   {state.ongoing_annotype}'
+        f'{str(state.cursor.document_index + 1).rjust(len(n_docs))}/{n_docs}   '
+        f'{doc.format}:{doc.language.upper()}   {state.ongoing_annotype}'
     )
 
 def display_text_selection(doc: Document, selection: tuple[int, int] | None):
@@ -24,7 +38,7 @@ def display_text_selection(doc: Document, selection: tuple[int, int] | None):
             isinstance(doc, WdAnnoHtmlDocument)
             or isinstance(doc, LocalFtmlDocument)
     ):
-        if get_config().getboolean('stextools.snify', 'strip_html_style_attrs', fallback=False):
+        if _strip_html_style_attrs():
             def _remove_style_attrs(html: str) -> str:
                 # TODO: cleaner implementation
                 return re.sub(r'\sstyle="[^"]*"', '', html)
@@ -35,12 +49,14 @@ def display_text_selection(doc: Document, selection: tuple[int, int] | None):
         # render the HTML, rather than its source
         if isinstance(selection, tuple):
             a, b = selection
+            doc_content = doc.get_content()
+            body_start, body_end = doc.get_body_range()
             content = (
-                    _remove_style_attrs(doc.get_content()[doc.get_body_range()[0]:a]) +
+                    _remove_style_attrs(doc_content[body_start:a]) +
                     '<span class="highlight" id="snifyhighlight">' +  # TODO: in MathML, this works but is not ideal
-                    _remove_style_attrs(doc.get_content()[a:b]) +
+                    _remove_style_attrs(doc_content[a:b]) +
                     '</span>' +
-                    _remove_style_attrs(doc.get_content()[b:doc.get_body_range()[1]])
+                    _remove_style_attrs(doc_content[b:body_end])
             )
         else:
             content = doc.get_body_content()
@@ -56,7 +72,7 @@ def display_text_selection(doc: Document, selection: tuple[int, int] | None):
             doc.get_content(),
             doc.format,  # type: ignore
             highlight_range=selection if isinstance(selection, tuple) else None,
-            limit_range=get_config().getint('stextools.snify', 'display_context_lines', fallback=5)
+            limit_range=get_display_context_lines()
         )
 
 
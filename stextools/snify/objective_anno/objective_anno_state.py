@@ -25,6 +25,9 @@ DIM_BY_LETTER: dict[str, Dimension] = {
     for f in (str.upper, str.lower)
 }
 
+# the FLAMS json is big, and objectives cannot be found in these keys
+OBJECTIVE_SCAN_IGNORED_KEYS = frozenset({'full_range', 'parsed_args', 'name_range'})
+
 @dataclasses.dataclass
 class ObjectiveStatus:
     uri: str
@@ -33,7 +36,7 @@ class ObjectiveStatus:
     @classmethod
     def from_flams_json(cls, flams_json: dict) -> list['ObjectiveStatus']:
         objectives: dict[str, ObjectiveStatus] = {}
-        for e in json_iter(flams_json, ignore_keys={'full_range', 'parsed_args', 'name_range'}):
+        for e in json_iter(flams_json, ignore_keys=OBJECTIVE_SCAN_IGNORED_KEYS):
             if not isinstance(e, dict):
                 continue
             if 'SymName' in e or 'Symref' in e:
@@ -1,10 +1,9 @@
 from typing import Optional
 
-from stextools.config import get_config
 from stextools.snify.annotype import AnnoType, StateType, StepperStatus
-from stextools.snify.displaysupport import display_snify_header, stex_symbol_style
+from stextools.snify.displaysupport import display_snify_header, stex_symbol_style, get_display_context_lines
 from stextools.snify.objective_anno.objective_anno_state import ObjectiveAnnoState, DIMENSIONS, ObjectiveStatus, \
-    DIM_TO_LETTER
+    DIM_TO_LETTER, OBJECTIVE_SCAN_IGNORED_KEYS
 from stextools.snify.objective_anno.objectives_management import get_content_start, ObjectiveModificationCommand, \
     FinalizedObjectivesCommand
 from stextools.snify.snify_commands import ExitFileCommand, SkipCommand, ViewCommand, get_set_cursor_after_edit_function
@@ -71,7 +70,7 @@ class ObjectiveAnnoType(AnnoType[ObjectiveAnnoState]):
     def get_flams_problem_json(self) -> tuple[dict, OpenedStexFLAMSFile]:
         flams_json, osff = self.get_flams_json()
         candidates = []
-        for e in json_iter(flams_json, ignore_keys={'full_range', 'parsed_args', 'name_range'}):
+        for e in json_iter(flams_json, ignore_keys=OBJECTIVE_SCAN_IGNORED_KEYS):
             if (not isinstance(e, dict)) or 'Problem' not in e:
                 continue
             range_ = osff.flams_range_to_offsets(e['Problem']['full_range'])
@@ -95,7 +94,7 @@ class ObjectiveAnnoType(AnnoType[ObjectiveAnnoState]):
         display_snify_header(self.snify_state)
         interface.show_code(
             ''.join(osff.text[content_start:].splitlines(keepends=True)[
-                        :min(get_config().getint('stextools.snify', 'display_context_lines', fallback=4) * 2 + 1,
+                        :min(get_display_context_lines() * 2 + 1,
                              flams_json['full_range']['end']['line'] - lineno)])
             ,
             format='sTeX',
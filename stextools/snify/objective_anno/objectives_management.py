@@ -1,7 +1,7 @@
 from typing import Sequence
 
 from stextools.snify.objective_anno.objective_anno_state import ObjectiveStatus, DIM_TO_LETTER, DIMENSIONS, \
-    DIM_BY_LETTER
+    DIM_BY_LETTER, OBJECTIVE_SCAN_IGNORED_KEYS
 from stextools.snify.snify_commands import SkipCommand
 from stextools.snify.snify_state import SnifyState, SnifyCursor
 from stextools.stepper.command import Command, CommandInfo, CommandOutcome
@@ -138,7 +138,7 @@ class ObjectiveModificationCommand(Command):
                 )
             elif dim not in dims and dim in objs.dimension:
                 # have to find and remove objective
-                for e in json_iter(self.flams_problem_json, ignore_keys={'full_range', 'parsed_args', 'name_range'}):
+                for e in json_iter(self.flams_problem_json, ignore_keys=OBJECTIVE_SCAN_IGNORED_KEYS):
                     if (not isinstance(e, dict)) or 'Objective' not in e:
                         continue
                     e = e['Objective']
@@ -63,13 +63,15 @@ class View_i_Command(Command):
 
 
 class ViewCommand(Command):
+    _INFO = CommandInfo(
+        show=False,
+        pattern_presentation='v',
+        description_short='iew file',
+        description_long='Show the current file fully'
+    )
+
     def __init__(self, current_document: Document):
-        super().__init__(CommandInfo(
-            show=False,
-            pattern_presentation='v',
-            description_short='iew file',
-            description_long='Show the current file fully')
-        )
+        super().__init__(self._INFO)
         self.current_document = current_document
 
     def execute(self, call: str) -> Sequence[CommandOutcome]:
@@ -84,13 +86,15 @@ class ViewCommand(Command):
 
 
 class ExitFileCommand(Command):
+    _INFO = CommandInfo(
+        show=False,
+        pattern_presentation='X',
+        description_short=' Exit file',
+        description_long='Exits the current file (and continues with the next one)'
+    )
+
     def __init__(self, state: SnifyState):
-        super().__init__(CommandInfo(
-            show=False,
-            pattern_presentation='X',
-            description_short=' Exit file',
-            description_long='Exits the current file (and continues with the next one)')
-        )
+        super().__init__(self._INFO)
         self.state = state
 
     def execute(self, call: str) -> Sequence[CommandOutcome]:
@@ -101,18 +105,20 @@ class ExitFileCommand(Command):
 
 
 class RescanOutcome(CommandOutcome):
-    pass
+    __slots__ = ()
 
 
 class RescanCommand(Command):
+    _INFO = CommandInfo(
+        show=False,
+        pattern_presentation='R',
+        description_short='escan',
+        description_long='Rescans some local files (useful if files were modified externally)\n' +
+                         'For a more complete reset, quit the program and clear the cache.'
+    )
+
     def __init__(self):
-        super().__init__(CommandInfo(
-            show=False,
-            pattern_presentation='R',
-            description_short='escan',
-            description_long='Rescans some local files (useful if files were modified externally)\n' +
-                             'For a more complete reset, quit the program and clear the cache.'
-        ))
+        super().__init__(self._INFO)
 
     def execute(self, call: str) -> Sequence[CommandOutcome]:
         return [RescanOutcome()]
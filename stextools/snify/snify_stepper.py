@@ -115,7 +115,7 @@ class SnifyStepper(
                 # If undoing modifications automatically leads to this point,
                 # it effectively breaks the redo functionality.
                 # Resetting might not be necessary as we are (probably?) not doing modifications with long-term impact.
-                self.modification_future = []
+                self.modification_future.clear()
 
                 return   # found something to annotate
 
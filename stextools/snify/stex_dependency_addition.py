@@ -12,6 +12,7 @@ The problem is inherently rather tricky:
 """
 
 import dataclasses
+import re
 from copy import deepcopy
 from typing import Sequence, Optional, Literal, Iterable, Callable
 
@@ -31,6 +32,9 @@ from stextools.stex.stex_py_parsing import iterate_latex_nodes
 from stextools.utils.json_iter import json_iter
 
 
+_SPACES_REGEX = re.compile(' *')
+
+
 class AnnotationAborted(Exception):
     pass
 
@@ -292,16 +296,8 @@ def get_import(
     explain_loc = lambda loc: f' after \\begin{{{loc}}}' if loc else ' at the beginning of the file'
 
     def _get_indentation(pos: int) -> str:
-        file_text = document.get_content()
-        indentation = '\n'
-        i = pos + 1
-        while i < len(file_text):
-            if file_text[i] == ' ':
-                indentation += ' '
-            else:
-                break
-            i += 1
-        return indentation
+        match = _SPACES_REGEX.match(document.get_content(), pos + 1)
+        return '\n' + (match.group() if match else '')
 
     def _get_use_struct(pos: int) -> str:
         if structure is None:
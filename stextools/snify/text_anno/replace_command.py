@@ -8,17 +8,19 @@ from stextools.stepper.interface import interface
 
 
 class ReplaceCommand(Command):
+    _INFO = CommandInfo(
+        show=False,
+        pattern_presentation='r',
+        pattern_regex='^r$',
+        description_short='eplace',
+        description_long='Replace the selected word with a different one.'
+    )
+
     def __init__(self, snify_state: SnifyState, anno_type_name: str):
         self.snify_state = snify_state
         self.anno_type_name = anno_type_name
 
-        super().__init__(CommandInfo(
-            show=False,
-            pattern_presentation='r',
-            pattern_regex='^r$',
-            description_short='eplace',
-            description_long='Replace the selected word with a different one.')
-        )
+        super().__init__(self._INFO)
 
     def execute(self, call: str) -> list[CommandOutcome]:
         state = self.snify_state[self.anno_type_name]
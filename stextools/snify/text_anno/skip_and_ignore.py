@@ -2,6 +2,7 @@ import dataclasses
 import functools
 import itertools
 import re
+import sys
 from copy import deepcopy
 from typing import Sequence, Literal
 
@@ -46,7 +47,8 @@ class StateSkipOutcome(CommandOutcome, Modification[SnifyState]):
         k, d = self._get_key_and_dict(state)
         if k not in d:
             d[k] = set()
-        d[k].add(self.word)
+        # skip sets are checked very frequently and typically contain the same (short) strings
+        d[k].add(sys.intern(self.word))
 
     def unapply(self, state: SnifyState):
         k, d = self._get_key_and_dict(state)
@@ -1,5 +1,6 @@
 import functools
 import re
+import sys
 from logging import getLogger
 
 from stextools.utils.linked_str import LinkedStr, string_to_lstr
@@ -30,8 +31,13 @@ def get_stem_fun(lang: str):
     # raise ValueError(f"Unsupported language: {lang}")
 
 
-@functools.cache  # note: caching results in a huge speedup
+@functools.lru_cache(maxsize=2**18)  # note: caching results in a huge speedup (bounded for long sessions)
 def mystem(word: str, lang: str) -> str:
+    # stems are used as keys in tries and skip sets, so we intern them (saves memory and speeds up lookups)
+    return sys.intern(_mystem(word, lang))
+
+
+def _mystem(word: str, lang: str) -> str:
     if word.isupper():  # acronym
         return word
 
@@ -40,11 +46,14 @@ def mystem(word: str, lang: str) -> str:
     if lang == 'en':
         if word and word[-1] == 's' and word[:-1].isupper():  # plural acronym
             return word[:-1]
-        return ' '.join(stem_fun(w) for w in word.split())
-    elif lang == 'de':
-        return ' '.join(stem_fun(w) for w in word.split())
-    else:
-        return ' '.join(stem_fun(w) for w in word.split())
+
+    if word.isalnum():   # fast path for the (very common) single-word case
+        return stem_fun(word)
+    return ' '.join(stem_fun(w) for w in word.split())
+
+
+_WORD_REGEX = re.compile(r'\b\w+\b')
+_SINGLE_WORD_REGEX = re.compile(r'\w+\Z')
 
 
 def string_to_stemmed_word_sequence(lstr: LinkedStr, lang: str) -> list[LinkedStr]:
@@ -52,12 +61,21 @@ def string_to_stemmed_word_sequence(lstr: LinkedStr, lang: str) -> list[LinkedSt
     # in particular, I think it does not cover diacritics...
     lstr = lstr.normalize_spaces()
     replacements = []
-    for match in re.finditer(r'\b\w+\b', str(lstr)):
-        word = lstr[match]
-        replacements.append((match.start(), match.end(), mystem(str(word), lang)))
+    for match in _WORD_REGEX.finditer(str(lstr)):
+        replacements.append((match.start(), match.end(), mystem(match.group(), lang)))
     lstr = lstr.replacements_at_positions(replacements, positions_are_references=False)
     words: list[LinkedStr] = []
-    for match in re.finditer(r'\b\w+\b', str(lstr)):
+
+    if all(_SINGLE_WORD_REGEX.match(stem) for _, _, stem in replacements):
+        # every stem is a single word, so the tokenization did not change
+        # -> we can compute the new word positions directly instead of tokenizing again
+        offset = 0
+        for start, end, stem in replacements:
+            words.append(lstr[start + offset:start + offset + len(stem)])
+            offset += len(stem) - (end - start)
+        return words
+
+    for match in _WORD_REGEX.finditer(str(lstr)):
         words.append(lstr[match])
     return words
 
@@ -65,6 +83,6 @@ def string_to_stemmed_word_sequence(lstr: LinkedStr, lang: str) -> list[LinkedSt
 def string_to_stemmed_word_sequence_simplified(string: str, lang: str) -> list[str]:
     # same as above, but without linked strings (more efficient)
     words: list[str] = []
-    for match in re.finditer(r'\b\w+\b', string):
+    for match in _WORD_REGEX.finditer(string):
         words.append(mystem(match.group(), lang))
     return words
@@ -52,11 +52,19 @@ def _get_catalog_for_lang(anno_format: str, lang: str) -> Optional[Catalog]:
         raise ValueError(f'Unknown annotation format: {anno_format}')
 
 
-def get_catalog_for_lang(anno_format: str, lang: str, stem_focus: Optional[str]) -> Optional[Catalog]:
+@functools.lru_cache(maxsize=64)   # sub-catalogs can be large, and there is usually one focus at a time
+def _get_catalog_for_stem(anno_format: str, lang: str, stem_focus: str) -> Optional[Catalog]:
+    """ building the sub-catalog is not cheap, and in focus mode we need it for every suggestion """
     catalog = _get_catalog_for_lang(anno_format, lang)
-    if catalog is not None and stem_focus is not None:
-        catalog = catalog.sub_catalog_for_stem(stem_focus)
-    return catalog
+    if catalog is None:
+        return None
+    return catalog.sub_catalog_for_stem(stem_focus)
+
+
+def get_catalog_for_lang(anno_format: str, lang: str, stem_focus: Optional[str]) -> Optional[Catalog]:
+    if stem_focus is None:
+        return _get_catalog_for_lang(anno_format, lang)
+    return _get_catalog_for_stem(anno_format, lang, stem_focus)
 
 
 class TextAnnoType(AnnoType[TextAnnoState]):
@@ -88,10 +96,20 @@ class TextAnnoType(AnnoType[TextAnnoState]):
         if catalog is None:
             return None
 
+        # the skip sets do not depend on the segment, so we only compute them once
+        stems_to_ignore: Optional[set[str]] = None
+        words_to_ignore: Optional[set[str]] = None
+
         for segment in document.get_annotatable_plaintext():
             if segment.get_end_ref() <= position:
                 continue  # segment is before cursor
 
+            if stems_to_ignore is None or words_to_ignore is None:
+                doc_index = self.snify_state.cursor.document_index
+                content = document.get_content()
+                stems_to_ignore = self.state.get_skip_stems(document.language, doc_index, content)
+                words_to_ignore = self.state.get_skip_words(document.language, doc_index, content)
+
             # truncate segment to exclude everything before position
             if position >= segment.get_start_ref():
                 cutoff = segment.get_indices_from_ref_range(position, segment.get_end_ref())[0]
@@ -104,10 +122,8 @@ class TextAnnoType(AnnoType[TextAnnoState]):
 
             first_match = catalog.find_first_match(
                 string=str(segment),
-                stems_to_ignore=self.state.get_skip_stems(document.language, self.snify_state.cursor.document_index,
-                                                          document.get_content()),
-                words_to_ignore=self.state.get_skip_words(document.language, self.snify_state.cursor.document_index,
-                                                          document.get_content()),
+                stems_to_ignore=stems_to_ignore,
+                words_to_ignore=words_to_ignore,
                 symbols_to_ignore=set(),
             )
             if first_match is not None:
@@ -130,6 +146,7 @@ class TextAnnoType(AnnoType[TextAnnoState]):
     def rescan(self):
         _get_stex_catalogs.cache_clear()
         _get_catalog_for_lang.cache_clear()
+        _get_catalog_for_stem.cache_clear()
         self.get_annotation_candidates_actual.cache_clear()
         if self.anno_format == 'stex':   # TODO: we need a better way to only reset this once
             FLAMS.reset_global_backend()
@@ -150,9 +167,9 @@ class TextAnnoType(AnnoType[TextAnnoState]):
         _, _, candidates = catalog.find_first_match(
             string=str(doc_content[self.state.selection[0]:self.state.selection[1]]),
             stems_to_ignore=self.state.get_skip_stems(document.language, self.snify_state.cursor.document_index,
-                                                      document.get_content()),
+                                                      doc_content),
             words_to_ignore=self.state.get_skip_words(document.language, self.snify_state.cursor.document_index,
-                                                      document.get_content()),
+                                                      doc_content),
             symbols_to_ignore=set(),
         ) or (-1, -1, [])
         sorting_keys = TextAnnoType._candidate_sorting_keys
@@ -15,17 +15,20 @@ and asks the user for a command that will be executed.
 
 import dataclasses
 import re
-from typing import Sequence, Iterable
+from typing import Sequence, Optional
 
 from stextools.stepper.interface import interface
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True, slots=True)
 class CommandInfo:
     """
     Essentially metadata for a command.
 
     It describes how the command can be invoked and how the command should be presented to the user.
+
+    Instances are immutable, so commands with a static description can share a single instance
+    (rather than creating a new one every time the command collection is built).
     """
     pattern_presentation: str
     description_short: str
@@ -34,19 +37,24 @@ class CommandInfo:
 
     show: bool = True   # set to False if the command should only be shown in the help text
 
+    pattern_compiled: re.Pattern = dataclasses.field(init=False, repr=False, compare=False)
+
     def __post_init__(self):
         if not self.pattern_regex:
-            self.pattern_regex = '^' + self.pattern_presentation + '$'
+            object.__setattr__(self, 'pattern_regex', '^' + self.pattern_presentation + '$')
+        object.__setattr__(self, 'pattern_compiled', re.compile(self.pattern_regex))
 
         if not self.description_long:
-            self.description_long = self.description_short
+            object.__setattr__(self, 'description_long', self.description_short)
 
 
 class CommandOutcome:
     """Result of executing a command."""
+    # outcomes are created (and discarded) for every command -> subclasses should use __slots__ if possible
+    __slots__ = ()
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class SimpleCommandOutcome(CommandOutcome):
     """For simple implementations, it suffices to just return the call."""
     call: str
@@ -79,19 +87,22 @@ class Command:
 
 class _HelpCommand(Command):
     """ Should only be instantiated by CommandCollection! """
+    _INFO = CommandInfo(
+        pattern_presentation='h',
+        pattern_regex='^h$',
+        description_short='elp',
+        description_long='Displays this help message'
+    )
+
     def __init__(self, command_collection: 'CommandCollection'):
-        super().__init__(CommandInfo(
-            pattern_presentation='h',
-            pattern_regex='^h$',
-            description_short='elp',
-            description_long='Displays this help message')
-        )
+        super().__init__(self._INFO)
         self.command_collection = command_collection
 
     def execute(self, call: str) -> Sequence[CommandOutcome]:
         with interface.big_infopage():
             interface.write_header(f'Help ({self.command_collection.name})', style='subdialog')
             interface.newline()
+            self.help_display()   # the help command is not part of command_collection.commands
             for command in self.command_collection.commands:
                 if isinstance(command, Command):
                     command.help_display()
@@ -101,6 +112,16 @@ class _HelpCommand(Command):
         return []
 
 
+def _get_literal(pattern_regex: str) -> Optional[str]:
+    """ returns the string matched by patterns like '^uu$' (or None if the pattern is not a plain literal) """
+    if len(pattern_regex) < 3 or pattern_regex[0] != '^' or pattern_regex[-1] != '$':
+        return None
+    literal = pattern_regex[1:-1]
+    if re.escape(literal) != literal:   # contains special characters
+        return None
+    return literal
+
+
 @dataclasses.dataclass
 class CommandSectionLabel:
     message: str
@@ -118,34 +139,92 @@ class CommandCollection:
     def __post_init__(self):
         self.commands = [c for c in self.commands if c is not None]
 
-        if self.have_help:
-            self.commands = [_HelpCommand(self)] + self.commands
+        # kept separately (rather than prepended to self.commands) to avoid copying the list again
+        self._help: Optional[_HelpCommand] = _HelpCommand(self) if self.have_help else None
+
+        # the commands do not change after construction, so we can compute these once
+        self._pure_commands: tuple[Command, ...] = (
+            ((self._help,) if self._help is not None else ())
+            + tuple(c for c in self.commands if isinstance(c, Command))
+        )
+        self._show_all: bool = all(c.command_info.show for c in self._pure_commands)
+
+        # most commands are plain literals (e.g. '^q$') -> dispatch them via a dict lookup
+        self._literal_commands: dict[str, tuple[int, Command]] = {}
+        self._regex_commands: list[tuple[int, Command]] = []
+        for i, command in enumerate(self._pure_commands):
+            literal = _get_literal(command.command_info.pattern_regex)
+            if literal is None:
+                self._regex_commands.append((i, command))
+            elif literal not in self._literal_commands:   # the first command wins
+                self._literal_commands[literal] = (i, command)
+
+        self._commands_by_group: dict[str, tuple[int, Command]] = {}
+        self._dispatch_regex: Optional[re.Pattern] = self._get_dispatch_regex()
+
+    def _get_dispatch_regex(self) -> Optional[re.Pattern]:
+        """
+        Combines the patterns of all non-literal commands into a single regex.
+        The name of the matching group identifies the command.
+        Alternatives are tried in order, so the first matching command wins.
+
+        Returns None if the patterns cannot be combined
+        (capturing groups, e.g. for back references, would get shifted).
+        """
+        alternatives: list[str] = []
+        for i, command in self._regex_commands:
+            if command.command_info.pattern_compiled.groups:
+                return None
+            self._commands_by_group[f'c{i}'] = (i, command)
+            alternatives.append(f'(?P<c{i}>{command.command_info.pattern_regex})')
+        if not alternatives:
+            return None
+        try:
+            return re.compile('|'.join(alternatives))
+        except re.error:   # e.g. global flags that are not at the start anymore
+            return None
+
+    def _match_regex_commands(self, call: str) -> Optional[tuple[int, Command]]:
+        if self._dispatch_regex is not None:
+            match = self._dispatch_regex.match(call)
+            if match is None or match.lastgroup is None:
+                return None
+            return self._commands_by_group[match.lastgroup]
+
+        for i, command in self._regex_commands:
+            if command.command_info.pattern_compiled.match(call):
+                return i, command
+        return None
+
+    def _find_command(self, call: str) -> Optional[Command]:
+        # '$' also matches before a trailing newline
+        index, command = self._literal_commands.get(call.removesuffix('\n'), (len(self._pure_commands), None))
+        if self._regex_commands and self._regex_commands[0][0] < index:
+            # a non-literal command that comes first might match as well
+            r = self._match_regex_commands(call)
+            if r is not None and r[0] < index:
+                return r[1]
+        return command
 
     def apply(self) -> Sequence[CommandOutcome]:
         self._print_commands()
         interface.write_text('>>>', style='bold')
         call = interface.get_input()
 
-        for command in self._pure_commands():
-            if re.match(command.command_info.pattern_regex, call):
-                return command.execute(call)
+        command = self._find_command(call)
+        if command is not None:
+            return command.execute(call)
 
         interface.admonition(f'Invalid command {call!r}', 'error', confirm=True)
         return []
 
-    def _pure_commands(self) -> Iterable[Command]:
-        for c in self.commands:
-            if isinstance(c, Command):
-                yield c
-
     def _print_commands(self):
-        show_all = all(c.command_info.show for c in self._pure_commands())
         interface.write_text('Commands:')
-        if not show_all and self.have_help:
+        if not self._show_all and self.have_help:
             interface.write_text(' ')
             interface.write_text('enter h (help) to see all available commands', style='pale')
         interface.newline()
 
-        for command in self._pure_commands():
+        for command in self._pure_commands:
             if command.command_info.show:
                 command.standard_display()
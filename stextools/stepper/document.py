@@ -1,10 +1,16 @@
 import abc
+import collections
 import dataclasses
 import functools
-import itertools
+import heapq
 import logging
+import os
+import sys
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable, Optional, TypeAlias, Literal, cast
+from typing import Iterable, Iterator, Optional, TypeAlias, Literal, cast
 
 from pylatexenc.latexwalker import LatexWalker, LatexMathNode, LatexCommentNode, LatexSpecialsNode, LatexMacroNode, \
     LatexEnvironmentNode, LatexGroupNode, LatexCharsNode
@@ -23,6 +29,118 @@ logger = logging.getLogger(__name__)
 
 MODE: TypeAlias = Literal['text', 'math']
 
+@functools.lru_cache(maxsize=2**16)   # bounded (Path objects cannot be weakly referenced)
+def intern_path(path: Path) -> Path:
+    """ returns a canonical object for equal paths (like sys.intern for strings).
+    Documents for the same file are created repeatedly (e.g. for dependencies),
+    and set/dict lookups are faster if the keys are identical objects. """
+    return path
+
+
+@functools.lru_cache(maxsize=2**12)
+def _resolve_directory(directory: Path) -> Path:
+    return directory.resolve()
+
+
+def resolve_file_path(path: Path) -> Path:
+    """ Like ``path.resolve()``, but the resolution of the containing directory is cached
+    (resolving requires system calls for every path component, and we typically have many files per directory).
+    Note that changes to symlinks during the run are not noticed. """
+    return _resolve_absolute_file_path(path.absolute())   # absolute first, so that the cache does not depend on cwd
+
+
+@functools.lru_cache(maxsize=2**16)   # the same file is typically resolved repeatedly (e.g. again when creating the document)
+def _resolve_absolute_file_path(path: Path) -> Path:
+    if path.name in ('', '.', '..') or path.is_symlink():
+        return path.resolve()
+    return _resolve_directory(path.parent) / path.name
+
+
+# node types that cannot contain formulae
+_FORMULA_SKIPPED_NODE_TYPES = frozenset({LatexCommentNode, LatexCharsNode, LatexSpecialsNode})
+_WD_FORMULA_SKIPPED_NODE_TYPES = frozenset({LatexCommentNode, LatexSpecialsNode})
+
+
+def _iter_formula_nodes(nodes, skipped_node_types: frozenset) -> Iterator:
+    """ Yields the math nodes (and chars nodes, unless skipped) in document order.
+
+    Uses an explicit stack instead of recursion as LaTeX can be deeply nested
+    (and nested generators are slow).
+    """
+    stack: list[Iterator] = [iter(nodes)]
+    while stack:
+        for node in stack[-1]:
+            if node is None:
+                continue
+            node_type = node.nodeType()
+            if node_type in skipped_node_types:
+                continue
+            if node_type is LatexMathNode or node_type is LatexCharsNode:
+                yield node
+            elif node_type is LatexMacroNode:
+                # TODO: should we actually follow the plaintext extraction rules?
+                if node.macroname in PLAINTEXT_EXTRACTION_MACRO_RECURSION:
+                    stack.append(iter([
+                        node.nodeargd.argnlist[arg_idx]
+                        for arg_idx in PLAINTEXT_EXTRACTION_MACRO_RECURSION[node.macroname]
+                    ]))
+                    break
+            elif node_type is LatexEnvironmentNode:
+                if node.envname in PLAINTEXT_EXTRACTION_ENVIRONMENT_RULES:
+                    recurse_content, recurse_args = PLAINTEXT_EXTRACTION_ENVIRONMENT_RULES[node.envname]
+                else:
+                    recurse_content, recurse_args = True, []
+                children = [node.nodeargd.argnlist[arg_idx] for arg_idx in recurse_args]
+                if recurse_content:
+                    children.extend(node.nodelist)
+                stack.append(iter(children))
+                break
+            elif node_type is LatexGroupNode:
+                stack.append(iter(node.nodelist))
+                break
+            else:
+                raise RuntimeError(f"Unexpected node type: {node_type}")
+        else:
+            stack.pop()   # all nodes on this level are processed
+
+
+class _CachingLatexWalker(LatexWalker):
+    """ remembers the result of parsing the whole document (i.e. ``get_latex_nodes()`` without arguments) """
+    _all_nodes = None
+
+    def get_latex_nodes(self, *args, **kwargs):
+        if args or kwargs:
+            return super().get_latex_nodes(*args, **kwargs)
+        if self._all_nodes is None:
+            self._all_nodes = super().get_latex_nodes()
+        return self._all_nodes
+
+
+@functools.lru_cache(maxsize=8)
+def _get_stex_latex_walker(content: str) -> LatexWalker:
+    """ parsing is expensive, and the same content is typically parsed several times
+    (e.g. for plaintext extraction, dependency checks, and after undo/redo) """
+    return _CachingLatexWalker(content, latex_context=STEX_CONTEXT_DB)
+
+
+# The results of the following functions are shared between callers,
+# so they are returned as tuples (LinkedStr objects are immutable anyway).
+
+@functools.lru_cache(maxsize=8)
+def _get_stex_annotatable_plaintext(content: str) -> tuple[LinkedStr[None], ...]:
+    """ snify asks for the plaintext of the same content after every step """
+    return tuple(get_annotatable_plaintext(_get_stex_latex_walker(content)))
+
+
+@functools.lru_cache(maxsize=8)
+def _get_stex_annotatable_formulae(content: str) -> tuple[LinkedStr[None], ...]:
+    return tuple(STeXDocument._iter_annotatable_formulae(content))
+
+
+@functools.lru_cache(maxsize=8)
+def _get_stex_plaintext_approximation(content: str) -> LinkedStr:
+    return get_plaintext_approx(_get_stex_latex_walker(content))
+
 
 @dataclasses.dataclass
 class Document(abc.ABC):
@@ -30,6 +148,11 @@ class Document(abc.ABC):
     format: str
     language: str
 
+    def __post_init__(self):
+        # there are many documents, but only a few different formats/languages
+        self.format = sys.intern(self.format)
+        self.language = sys.intern(self.language)
+
     @abc.abstractmethod
     def get_content(self) -> str:
         pass
@@ -48,12 +171,12 @@ class Document(abc.ABC):
         raise NotImplementedError(f'{type(self)}.get_annotatable_formulae not implemented.')
 
     def get_all_annotatable(self) -> Iterable[tuple[MODE, LinkedStr[None]]]:
-        l: list[tuple[MODE, LinkedStr[None]]] = list(itertools.chain(
-            (( cast(MODE, 'text'), lstr) for lstr in self.get_annotatable_plaintext()),
-            ((cast(MODE, 'math'), lstr) for lstr in self.get_annotatable_formulae())
-        ))
-        l.sort(key=lambda x: x[1].get_start_ref())
-        return l
+        # both are produced in document order, so merging them suffices
+        return heapq.merge(
+            ((cast(MODE, 'text'), lstr) for lstr in self.get_annotatable_plaintext()),
+            ((cast(MODE, 'math'), lstr) for lstr in self.get_annotatable_formulae()),
+            key=lambda x: x[1].get_start_ref(),
+        )
 
     def get_plaintext_approximation(self) -> LinkedStr:
         raise NotImplementedError(f'get_plaintext_approximation not implemented for {self.format} documents.')
@@ -65,14 +188,40 @@ class Document(abc.ABC):
         return []
 
 
+class _ContentCache:
+    """ Keeps track of the documents whose content is held in memory,
+    and drops the content of the least recently used ones
+    (otherwise, long sessions would keep every file in memory). """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._documents: collections.OrderedDict[int, 'LocalFileDocument'] = collections.OrderedDict()
+        self._lock = threading.Lock()   # contents may be loaded concurrently (see _prefetch_contents)
+
+    def touch(self, document: 'LocalFileDocument'):
+        with self._lock:
+            key = id(document)
+            if key in self._documents:
+                self._documents.move_to_end(key)
+                return
+            self._documents[key] = document
+            while len(self._documents) > self.max_size:
+                _, evicted = self._documents.popitem(last=False)
+                evicted.drop_content()
+
+
+_content_cache = _ContentCache(max_size=128)
+
+
 class LocalFileDocument(Document, abc.ABC):
     _content: Optional[str] = None
+    _content_mtime_ns: Optional[int] = None   # modification time of the file when _content was read/written
     path: Path
 
     def __init__(self, path: Path, language: str, format: str):
-        self.path = path
+        self.path = intern_path(path)
         super().__init__(
-            identifier=str(path.resolve().absolute()),
+            identifier=sys.intern(str(resolve_file_path(path))),
             format=format,
             language=language
         )
@@ -81,16 +230,32 @@ class LocalFileDocument(Document, abc.ABC):
         state = self.__dict__.copy()
         # we don't want to serialize the content, as it can be large and can be reloaded from the file
         state['_content'] = None
+        state['_content_mtime_ns'] = None
         return state
 
     def __setstate__(self, state):
         self.__dict__.update(state)
+        self.path = intern_path(self.path)
+        self.identifier = sys.intern(self.identifier)
         self._content = None
+        self._content_mtime_ns = None
 
     def get_content(self) -> str:
-        if self._content is None:
-            self._content = self.path.read_text()
-        return self._content
+        # a stat call is much cheaper than re-reading the file,
+        # and it lets us notice if the file was modified externally
+        mtime_ns = self.path.stat().st_mtime_ns
+        content = self._content
+        if content is None or mtime_ns != self._content_mtime_ns:
+            modified_externally = self._content_mtime_ns is not None and mtime_ns != self._content_mtime_ns
+            # decoding the raw bytes in one go is faster than going through a text wrapper
+            content = self.path.read_bytes().decode('utf-8')
+            self._content = content
+            self._content_mtime_ns = mtime_ns
+            if modified_externally:
+                # everything derived from the old content (e.g. offsets) is outdated
+                self.on_modified(reset_content=False)
+        _content_cache.touch(self)
+        return content
 
     def set_content(self, content: str):
         self.write_content(content)
@@ -100,108 +265,137 @@ class LocalFileDocument(Document, abc.ABC):
         if reset_content:
             self._content = None
 
+    def drop_content(self):
+        """ Frees the memory held for the content (it is re-read when needed). """
+        self._content = None
+
     def write_content(self, content: str) -> None:
         """ Writes the content to the file. """
-        self.path.write_text(content)
+        self.path.write_bytes(content.encode('utf-8'))
         self._content = content
+        self._content_mtime_ns = self.path.stat().st_mtime_ns
+        _content_cache.touch(self)
+
+
+_INPUT_DEPENDENCY_KEYS = ('IncludeProblem', 'Inputref')
+_NONINPUT_DEPENDENCY_KEYS = ('ImportModule', 'UseModule')
+_DEPENDENCY_KEYS = _INPUT_DEPENDENCY_KEYS + _NONINPUT_DEPENDENCY_KEYS
+_DEPENDENCY_KEYS_BY_MODE = {
+    'inputs': _INPUT_DEPENDENCY_KEYS,
+    'noninputs': _NONINPUT_DEPENDENCY_KEYS,
+    'both': _DEPENDENCY_KEYS,
+}
+# keys of the FLAMS annotations that cannot contain dependencies
+_DEPENDENCY_SCAN_IGNORED_KEYS = frozenset({
+    'full_range', 'val_range', 'key_range', 'Sig', 'smodule_range', 'Title', 'path_range', 'archive_range'
+})
+
+
+# documents are only kept as long as they are used elsewhere (see STeXDocument.get_or_create)
+_STEX_DOCUMENTS: 'weakref.WeakValueDictionary[tuple[str, str], STeXDocument]' = weakref.WeakValueDictionary()
 
 
 class STeXDocument(LocalFileDocument):
     """ A local stex document. """
+    # (modification time, entries) - see _get_dependency_entries
+    _dependency_entries: Optional[tuple[int, list[tuple[str, dict]]]] = None
 
     def __init__(self, path: Path, language: str):
         super().__init__(path, language, 'sTeX')
 
+    @classmethod
+    def get_or_create(cls, path: Path, language: str) -> 'STeXDocument':
+        """ Returns the existing document object for the file if there is one.
+        The same modules get imported by many documents, and sharing the objects
+        means that their caches (content, dependencies, ...) are shared as well. """
+        key = (str(resolve_file_path(path)), language)
+        doc = _STEX_DOCUMENTS.get(key)
+        if doc is None:
+            doc = cls(path=path, language=language)
+            _STEX_DOCUMENTS[key] = doc
+        return doc
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop('_dependency_entries', None)
+        return state
+
     def on_modified(self, reset_content: bool = True):
         # self.get_latex_walker.cache_clear()
-        FLAMS.load_file(self.identifier)
+        FLAMS.mark_modified(self.identifier)
+        self._dependency_entries = None
         LocalFileDocument.on_modified(self, reset_content=reset_content)
 
     def get_latex_walker(self) -> LatexWalker:
-        """ Returns a LatexWalker for the document content. """
-        content = self.get_content()
-        return LatexWalker(content, latex_context=STEX_CONTEXT_DB)
+        """ Returns a LatexWalker for the document content (cached by content). """
+        return _get_stex_latex_walker(self.get_content())
 
     def get_annotatable_plaintext(self) -> Iterable[LinkedStr[None]]:
-        return get_annotatable_plaintext(
-            self.get_latex_walker()
-        )
+        return _get_stex_annotatable_plaintext(self.get_content())
 
     def get_annotatable_formulae(self) -> Iterable[LinkedStr[None]]:
-        walker = self.get_latex_walker()
-
-        def _recurse(nodes):
-            for node in nodes:
-                if node is None or node.nodeType() in {LatexCommentNode, LatexCharsNode, LatexSpecialsNode}:
-                    continue
-                elif node.nodeType() == LatexMathNode:
-                    yield string_to_lstr(self.get_content()[node.pos:node.pos+node.len], node.pos)
-                elif node.nodeType() == LatexMacroNode:
-                    # TODO: should we actually follow the plaintext extraction rules?
-                    if node.macroname in PLAINTEXT_EXTRACTION_MACRO_RECURSION:
-                        for arg_idx in PLAINTEXT_EXTRACTION_MACRO_RECURSION[node.macroname]:
-                            yield from _recurse([node.nodeargd.argnlist[arg_idx]])
-                elif node.nodeType() == LatexEnvironmentNode:
-                    if node.envname in PLAINTEXT_EXTRACTION_ENVIRONMENT_RULES:
-                        recurse_content, recurse_args = PLAINTEXT_EXTRACTION_ENVIRONMENT_RULES[node.envname]
-                    else:
-                        recurse_content, recurse_args = True, []
-                    for arg_idx in recurse_args:
-                        yield from _recurse([node.nodeargd.argnlist[arg_idx]])
-                    if recurse_content:
-                        yield from _recurse(node.nodelist)
-                elif node.nodeType() == LatexGroupNode:
-                    yield from _recurse(node.nodelist)
-                else:
-                    raise RuntimeError(f"Unexpected node type: {node.nodeType()}")
+        return _get_stex_annotatable_formulae(self.get_content())
 
-        yield from _recurse(walker.get_latex_nodes()[0])
+    @staticmethod
+    def _iter_annotatable_formulae(content: str) -> Iterator[LinkedStr[None]]:
+        walker = _get_stex_latex_walker(content)
+        for node in _iter_formula_nodes(walker.get_latex_nodes()[0], _FORMULA_SKIPPED_NODE_TYPES):
+            yield string_to_lstr(content[node.pos:node.pos+node.len], node.pos)
 
     def get_plaintext_approximation(self) -> LinkedStr:
-        return get_plaintext_approx(self.get_latex_walker())
+        return _get_stex_plaintext_approximation(self.get_content())
+
+    def _get_dependency_entries(self) -> list[tuple[str, dict]]:
+        """ The relevant FLAMS annotations for get_dependencies as (key, value) pairs
+        (e.g. ``('Inputref', {...})``).
+        Walking the annotations is expensive, so the result is cached (until the file changes). """
+        mtime_ns = self.path.stat().st_mtime_ns
+        if self._dependency_entries is None or self._dependency_entries[0] != mtime_ns:
+            annos = FLAMS.get_file_annotations(self.path)
+            entries: list[tuple[str, dict]] = []
+            for e in json_iter(annos, _DEPENDENCY_SCAN_IGNORED_KEYS):
+                if not isinstance(e, dict):
+                    continue
+                for key in _DEPENDENCY_KEYS:
+                    if key in e:
+                        entries.append((key, e[key]))
+                        break
+            self._dependency_entries = (mtime_ns, entries)
+        return self._dependency_entries[1]
 
     def get_inputted_documents(self) -> Iterable['Document']:
         return self.get_dependencies(mode='inputs')
 
     def get_dependencies(self, mode: Literal['inputs', 'noninputs', 'both']) -> Iterable['Document']:
         """ not transitive """
-        if mode == 'inputs':
-            keys = {'IncludeProblem', 'Inputref'}
-        elif mode == 'noninputs':
-            keys = {'ImportModule', 'UseModule'}
-        else:
-            assert mode == 'both'
-            keys = {'IncludeProblem', 'Inputref', 'ImportModule', 'UseModule'}
+        keys = _DEPENDENCY_KEYS_BY_MODE[mode]
 
-        annos = FLAMS.get_file_annotations(self.path)
-        for e in json_iter(annos, {'full_range', 'val_range', 'key_range', 'Sig', 'smodule_range', 'Title',
-                                   'path_range', 'archive_range'}):
-            if not isinstance(e, dict):
-                continue
-            if all(k not in e for k in keys):
+        own_repo: Optional[Path] = None   # determined lazily
+        for key, value in self._get_dependency_entries():
+            if key not in keys:
                 continue
 
-            if 'IncludeProblem' in e or 'Inputref' in e:
-                key = 'IncludeProblem' if 'IncludeProblem' in e else 'Inputref'
-                if e[key]['archive']:
-                    repo = get_mathhub_path() / e[key]['archive'][0]
+            if key in _INPUT_DEPENDENCY_KEYS:
+                if value['archive']:
+                    repo = get_mathhub_path() / value['archive'][0]
                 else:
-                    repo = get_containing_archive(self.path)
+                    if own_repo is None:
+                        own_repo = get_containing_archive(self.path)
+                    repo = own_repo
                     if repo is None:
                         interface.write_text(
                             f"Warning: {self.path} uses inputref without archive, but is not in a git repo.\n",
                             style='warning'
                         )
                         continue
-                path = repo / 'source' / e[key]['filepath'][0]
+                path = repo / 'source' / value['filepath'][0]
                 if not path.exists():
                     interface.write_text(f"Warning: {path} does not exist. (included by {self.path})\n", style='warning')
                     continue
-                yield STeXDocument(path=path, language=lang_from_path(path))
-            elif 'ImportModule' in e or 'UseModule' in e:
-                key = 'ImportModule' if 'ImportModule' in e else 'UseModule'
-                # uri = e[key]['module']['uri']
-                path_val = e[key]['module']['full_path']
+                yield STeXDocument.get_or_create(path=path, language=lang_from_path(path))
+            else:
+                # uri = value['module']['uri']
+                path_val = value['module']['full_path']
                 if not path_val:
                     interface.write_text(
                         f'Warning: could not determine path for module included by {self.path}\n',
@@ -209,7 +403,7 @@ class STeXDocument(LocalFileDocument):
                     )
                     continue
                 path = Path(path_val)
-                yield STeXDocument(path=path, language=lang_from_path(path))
+                yield STeXDocument.get_or_create(path=path, language=lang_from_path(path))
                 # for v in get_transitive_imports([(uri, path)]).values():
                 #     yield STeXDocument(path=Path(v), language=lang_from_path(Path(v)))
 
@@ -225,40 +419,14 @@ class WdAnnoTexDocument(LocalFileDocument):
         # self.get_latex_walker.cache_clear()
 
     def get_annotatable_formulae(self) -> Iterable[LinkedStr[None]]:
-        result: list[LinkedStr] = []
         walker = self.get_latex_walker()
         # walker = LatexWalker(latex_text, latex_context=STEX_CONTEXT_DB)
         latex_text = walker.s
-
-        def _recurse(nodes):
-            for node in nodes:
-                if node is None or node.nodeType() in {LatexCommentNode, LatexSpecialsNode}:
-                    continue
-                if node.nodeType() == LatexMathNode:
-                    result.append(string_to_lstr(latex_text[node.pos:node.pos+node.len], node.pos))
-                elif node.nodeType() == LatexMacroNode:
-                    if node.macroname in PLAINTEXT_EXTRACTION_MACRO_RECURSION:
-                        for arg_idx in PLAINTEXT_EXTRACTION_MACRO_RECURSION[node.macroname]:
-                            _recurse([node.nodeargd.argnlist[arg_idx]])
-                elif node.nodeType() == LatexEnvironmentNode:
-                    if node.envname in PLAINTEXT_EXTRACTION_ENVIRONMENT_RULES:
-                        recurse_content, recurse_args = PLAINTEXT_EXTRACTION_ENVIRONMENT_RULES[node.envname]
-                    else:
-                        recurse_content, recurse_args = True, []
-                    for arg_idx in recurse_args:
-                        _recurse([node.nodeargd.argnlist[arg_idx]])
-                    if recurse_content:
-                        _recurse(node.nodelist)
-                elif node.nodeType() == LatexGroupNode:
-                    _recurse(node.nodelist)
-                elif node.nodeType() == LatexCharsNode:
-                    result.append(string_to_lstr(node.chars, node.pos))
-                else:
-                    raise RuntimeError(f"Unexpected node type: {node.nodeType()}")
-
-        _recurse(walker.get_latex_nodes()[0])
-
-        return result
+        for node in _iter_formula_nodes(walker.get_latex_nodes()[0], _WD_FORMULA_SKIPPED_NODE_TYPES):
+            if node.nodeType() is LatexCharsNode:
+                yield string_to_lstr(node.chars, node.pos)
+            else:
+                yield string_to_lstr(latex_text[node.pos:node.pos+node.len], node.pos)
 
     # copy everything else from STeXDocument (it's just a prototype, if successful, we can improve it)
     get_latex_walker = STeXDocument.get_latex_walker
@@ -273,16 +441,25 @@ class LocalHtmlDocument(LocalFileDocument):
 
         self.html_parser: Optional[MyHtmlParser] = None
 
-    def set_content(self, content: str):
-        super().set_content(content)
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['html_parser'] = None   # holds a copy of the content, and can be re-created lazily
+        return state
+
+    def on_modified(self, reset_content: bool = True):
+        super().on_modified(reset_content)
         self.html_parser = None
-        with open(self.path, 'w') as fp:
-            fp.write(content)
+
+    def drop_content(self):
+        super().drop_content()
+        self.html_parser = None   # holds a copy of the content
 
     def _get_html_parser(self) -> MyHtmlParser:
+        # get_content also notices external modifications (and then resets the parser via on_modified)
+        content = self.get_content()
         if self.html_parser is None:
-            self.html_parser = MyHtmlParser(self.get_content())
-            self.html_parser.feed(self.get_content())
+            self.html_parser = MyHtmlParser(content)
+            self.html_parser.feed(content)
         return self.html_parser
 
     def get_body_range(self) -> tuple[int, int]:
@@ -314,6 +491,69 @@ class LocalFtmlDocument(LocalHtmlDocument):
         super().__init__(path, language, 'FTML')
 
 
+@functools.cache
+def _log_skipped_directory(directory: str):
+    logger.info(f'Skipping files in {directory}.')
+
+
+def _find_files(
+        root: Path, suffixes: tuple[str, ...], skip_stex_artifacts: bool = False
+) -> dict[str, list[Path]]:
+    """ Recursively collects files with the given suffixes (symlinked directories are not followed).
+
+    Equivalent to ``root.rglob('*' + suffix)`` for every suffix (same order of results),
+    but the directory tree is only traversed once.
+
+    If ``skip_stex_artifacts`` is set, the ``.tex`` files in ``.flams`` directories
+    and in the ``lib`` directory of archives are skipped (they crash FLAMS).
+    """
+    result: dict[str, list[Path]] = {suffix: [] for suffix in suffixes}
+
+    def _recurse(directory: str, in_flams: bool):
+        skip_tex = skip_stex_artifacts and (in_flams or (
+            os.path.basename(directory) == 'lib'
+            and os.path.exists(os.path.join(os.path.dirname(directory), '.git'))
+        ))
+        if skip_tex and '.tex' in suffixes:
+            _log_skipped_directory(directory)
+        subdirs: list[str] = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                else:
+                    for suffix in suffixes:
+                        if entry.name.endswith(suffix):
+                            if skip_tex and suffix == '.tex':
+                                continue
+                            result[suffix].append(Path(entry.path))
+        for subdir in subdirs:
+            _recurse(subdir, in_flams or os.path.basename(subdir) == '.flams')
+
+    _recurse(os.fspath(root), '.flams' in root.parts)
+    return result
+
+
+_PREFETCH_THRESHOLD = 8   # for fewer files, setting up a thread pool is not worth it
+
+
+def _prefetch_contents(documents: list[Document]):
+    """ Loads the file contents concurrently (reading is I/O-bound, so threads help despite the GIL). """
+    # there is no point in loading more contents than we keep (the first documents are needed first)
+    local_docs = [doc for doc in documents if isinstance(doc, LocalFileDocument)][:_content_cache.max_size]
+    if len(local_docs) < _PREFETCH_THRESHOLD:
+        return
+
+    def _load(doc: LocalFileDocument):
+        try:
+            doc.get_content()
+        except (OSError, UnicodeDecodeError):
+            pass   # the error will come up again when the content is actually needed
+
+    with ThreadPoolExecutor(max_workers=min(32, len(local_docs))) as executor:
+        executor.map(_load, local_docs)   # leaving the with block waits for all loads
+
+
 def documents_from_paths(
         paths: list[Path],
         annotation_format: Literal['stex', 'wikidata'] = 'stex',
@@ -338,48 +578,65 @@ def documents_from_paths(
     # documents should be uniquely identified Document.identifier
     all_identifiers: set[str] = set()
 
-    already_considered_file_paths: set[Path] = set()
+    # keyed by (normalized) path strings, which are cheaper to hash and compare than Path objects
+    already_considered_file_paths: set[str] = set()
 
     # Step 1: make a list of all relevant files
     file_paths: list[Path] = []
     for path in paths:
         if not path.exists():
             raise FileNotFoundError(f"Path {path} does not exist.")
+
+    # files in these directories are not sources (and FLAMS cannot handle them), so we don't even walk them
+    skip_stex_artifacts = annotation_format == 'stex'
+
+    # walking directory trees is I/O-bound, so we walk them concurrently if there are several
+    directories = [path for path in paths if not path.is_file()]
+    found_by_directory: dict[Path, dict[str, list[Path]]] = {}
+    if len(directories) > 1:
+        with ThreadPoolExecutor(max_workers=min(32, len(directories))) as executor:
+            found_by_directory = dict(zip(
+                directories,
+                executor.map(
+                    lambda directory: _find_files(directory, ('.tex', '.html'), skip_stex_artifacts),
+                    directories
+                )
+            ))
+
+    for path in paths:
         if path.is_file():
             files = [path]
         else:
-            files = list(path.rglob('*.tex'))
+            if path in found_by_directory:
+                found = found_by_directory[path]
+            else:
+                found = _find_files(path, ('.tex', '.html'), skip_stex_artifacts)
             # if annotation_format == 'wikidata':
-            for html_path in path.rglob('*.html'):
-                files.append(html_path)
+            files = found['.tex'] + found['.html']
 
-        for path in files:
-            path = path.resolve()
-            if path not in already_considered_file_paths:
-                file_paths.append(path)
-                already_considered_file_paths.add(path)
+        for file in files:
+            file = intern_path(resolve_file_path(file))
+            key = os.path.normcase(os.fspath(file))
+            if key not in already_considered_file_paths:
+                file_paths.append(file)
+                already_considered_file_paths.add(key)
 
     # Step 2: create Document objects for each file
     documents: list[Document] = []
 
-    @functools.cache
-    def log_once(msg: str):
-        logger.info(msg)
-
     for path in file_paths:
         if annotation_format == 'stex' and path.suffix == '.tex':
             if path.parent.name == 'lib' and (path.parent.parent / '.git').exists():
                 # skip lib files in archives (they crash FLAMS)
-                log_once(f'Skipping files in {path.parent}.')
+                _log_skipped_directory(os.fspath(path.parent))
                 continue
-            if '/.flams/' in str(path):
+            if '.flams' in path.parts:
                 subpath = path
-                while subpath and subpath.name != '.flams':
+                while subpath.name != '.flams':
                     subpath = subpath.parent
-                if subpath:
-                    log_once(f'Skipping files in {subpath}.')
-                    continue
-            new_doc = STeXDocument(path=path, language=lang_from_path(path))
+                _log_skipped_directory(os.fspath(subpath))
+                continue
+            new_doc = STeXDocument.get_or_create(path=path, language=lang_from_path(path))
         elif annotation_format == 'wikidata' and path.suffix == '.tex':
             new_doc = WdAnnoTexDocument(path=path, language=lang_from_path(path))
         elif annotation_format == 'wikidata' and path.suffix == '.html':
@@ -392,6 +649,8 @@ def documents_from_paths(
         documents.append(new_doc)
         all_identifiers.add(new_doc.identifier)
 
+    _prefetch_contents(documents)
+
     include_inputted_files: Optional[bool] = None
     if include_dependencies:
         include_inputted_files = True
@@ -401,10 +660,14 @@ def documents_from_paths(
             break
 
         # currently, only local files supported
-        inputted = [
-            doc for doc in document.get_inputted_documents()
-            if isinstance(doc, LocalFileDocument) and doc.identifier not in all_identifiers
-        ]
+        inputted: list[Document] = []
+        for doc in document.get_inputted_documents():
+            if doc.identifier in all_identifiers or not isinstance(doc, LocalFileDocument):
+                continue
+            # if the user declines, we stop anyway, so we can already mark the document as known
+            all_identifiers.add(doc.identifier)
+            inputted.append(doc)
+
         if inputted:
             if include_inputted_files is None:
                 include_inputted_files = interface.ask_yes_no(
@@ -412,10 +675,7 @@ def documents_from_paths(
                     default='yes'
                 )
             if include_inputted_files:
-                for doc in inputted:
-                    if doc.identifier not in all_identifiers:
-                        documents.append(doc)
-                        all_identifiers.add(doc.identifier)
+                documents.extend(inputted)
 
     if include_dependencies:   # non-input dependencies should come after input dependencies
         documents.extend(get_missing_dependencies(documents, all_identifiers))
@@ -423,6 +683,17 @@ def documents_from_paths(
     return documents
 
 
+@functools.lru_cache(maxsize=2**12)
+def _get_noninput_dependency_paths(path: Path, language: str, mtime_ns: int) -> tuple[Path, ...]:
+    """ The modification time is part of the key because the dependencies change when the file is edited
+    (e.g. when snify adds an \\importmodule).
+    We only keep the paths to avoid holding on to document objects (and their content). """
+    document = STeXDocument.get_or_create(path=path, language=language)
+    return tuple(
+        doc.path for doc in document.get_dependencies(mode='noninputs') if isinstance(doc, LocalFileDocument)
+    )
+
+
 def get_missing_dependencies(
         documents: list[Document],
         known_doc_ids: set[str],
@@ -439,21 +710,22 @@ def get_missing_dependencies(
     (first annotate the immediate dependencies)
     """
 
-    result = documents[:]
+    result: list[Document] = []
+    queue = collections.deque(documents)
 
-    for document in result:
+    while queue:
+        document = queue.popleft()
         if not isinstance(document, STeXDocument):  # currently, only STeX documents have non-input dependencies
             continue
 
-        dependencies = [
-            doc for doc in document.get_dependencies(mode='noninputs')
-        ]
-
-        for doc in dependencies:
-            if isinstance(doc, LocalFileDocument):
-                if doc.identifier not in known_doc_ids:
-                    result.append(doc)
-                    known_doc_ids.add(doc.identifier)
+        for path in _get_noninput_dependency_paths(
+                document.path, document.language, document.path.stat().st_mtime_ns
+        ):
+            doc = STeXDocument.get_or_create(path=path, language=lang_from_path(path))
+            if doc.identifier not in known_doc_ids:
+                result.append(doc)
+                queue.append(doc)
+                known_doc_ids.add(doc.identifier)
 
-    return result[len(documents):]  # only return the newly added documents
+    return result
 
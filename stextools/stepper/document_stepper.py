@@ -1,7 +1,8 @@
 import dataclasses
+import functools
+import hashlib
 import os
 import subprocess
-from copy import deepcopy
 from typing import Optional, Sequence, Callable
 
 from stextools.config import get_config
@@ -9,6 +10,7 @@ from stextools.stepper.command import CommandOutcome, Command, CommandInfo
 from stextools.stepper.document import Document, LocalFileDocument
 from stextools.stepper.interface import interface
 from stextools.stepper.stepper import State, Modification, StateType, Stepper
+from stextools.utils.common_affix import common_prefix_length, common_suffix_length
 
 
 @dataclasses.dataclass(frozen=True)
@@ -16,9 +18,8 @@ class DocumentCursor:
     document_index: int
 
     def with_document_index(self, new_index: int) -> 'DocumentCursor':
-        new_cursor = deepcopy(self)
-        object.__setattr__(new_cursor, 'document_index', new_index)
-        return new_cursor
+        # works for subclasses as well (other fields are shallow-copied - cursors are immutable anyway)
+        return dataclasses.replace(self, document_index=new_index)
 
 
 class DocumentStepperState(State[DocumentCursor]):
@@ -55,6 +56,8 @@ class DocumentCollectionModification(Modification[DocumentStepperState]):
 
 class SubstitutionOutcome(CommandOutcome):
     """Note: command is responsible for ensuring that the index is correct *after* the previous file modification outcomes."""
+    __slots__ = ('new_str', 'start_pos', 'end_pos')
+
     def __init__(self, new_str: str, start_pos: int, end_pos: int):
         self.new_str = new_str
         self.start_pos = start_pos
@@ -62,54 +65,240 @@ class SubstitutionOutcome(CommandOutcome):
 
 
 class TextRewriteOutcome(CommandOutcome):
+    __slots__ = ('new_text',)
+
     def __init__(self, new_text: str):
         self.new_text = new_text
 
 
+class BatchedSubstitutionOutcome(CommandOutcome):
+    """
+    Several substitutions that can be applied together (with a single rebuild of the document text).
+    Unlike for a sequence of ``SubstitutionOutcome``s, the positions refer to the text *before* any of them is applied.
+    The substitutions are sorted and do not overlap.
+    """
+    __slots__ = ('substitutions',)
+
+    def __init__(self, substitutions: list[SubstitutionOutcome]):
+        self.substitutions = substitutions
+
+
+def _add_to_batch(batch: list[SubstitutionOutcome], outcome: SubstitutionOutcome) -> Optional[list[SubstitutionOutcome]]:
+    """
+    ``outcome`` refers to the text after the substitutions in ``batch`` were applied.
+    Returns the extended batch or None if ``outcome`` overlaps with the batched substitutions.
+    """
+    shift = 0
+    for i, other in enumerate(batch):
+        current_start = other.start_pos + shift
+        current_end = current_start + len(other.new_str)
+        if outcome.end_pos <= current_start:
+            return batch[:i] + [
+                SubstitutionOutcome(outcome.new_str, outcome.start_pos - shift, outcome.end_pos - shift)
+            ] + batch[i:]
+        if outcome.start_pos < current_end:
+            return None
+        shift += len(other.new_str) - (other.end_pos - other.start_pos)
+    return batch + [SubstitutionOutcome(outcome.new_str, outcome.start_pos - shift, outcome.end_pos - shift)]
+
+
+def batch_substitutions(outcomes: Sequence[CommandOutcome]) -> list[CommandOutcome]:
+    """ Combines consecutive substitutions into ``BatchedSubstitutionOutcome``s where possible. """
+    result: list[CommandOutcome] = []
+    batch: list[SubstitutionOutcome] = []
+
+    def flush():
+        if len(batch) == 1:
+            result.append(batch[0])
+        elif batch:
+            result.append(BatchedSubstitutionOutcome(batch))
+
+    for outcome in outcomes:
+        if isinstance(outcome, SubstitutionOutcome):
+            extended = _add_to_batch(batch, outcome)
+            if extended is None:
+                flush()
+                batch = [outcome]
+            else:
+                batch = extended
+        else:
+            flush()
+            batch = []
+            result.append(outcome)
+    flush()
+    return result
+
+
+def _fingerprint(*parts: str) -> bytes:
+    """ A short fingerprint of a text, given as the concatenation of ``parts``
+    (to notice changes without keeping a copy of the full text). """
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode('utf-8'))
+    return h.digest()
+
+
+def _replaced_pieces(text: str, replacements: list[tuple[int, str, str]]) -> list[str]:
+    """ ``replacements`` are sorted, non-overlapping ``(start_pos, before, after)`` triples.
+    Returns the pieces of the new text (so that it can be fingerprinted without joining it first). """
+    pieces: list[str] = []
+    pos = 0
+    for start, before, after in replacements:
+        pieces.append(text[pos:start])
+        pieces.append(after)
+        pos = start + len(before)
+    pieces.append(text[pos:])
+    return pieces
+
+
+def _replace_fragments(
+        document: Document, replacements: list[tuple[int, str, str]], expected_length: int,
+        expected_fingerprint: bytes, last_access: str
+):
+    """ ``replacements`` as in ``_replaced_pieces`` """
+    current_text = document.get_content()
+    # the cheap checks first (the fingerprint is only checked if they pass)
+    if (
+            len(current_text) != expected_length
+            or not all(current_text.startswith(before, start) for start, before, _ in replacements)
+            or _fingerprint(current_text) != expected_fingerprint
+    ):
+        interface.write_text(
+            f"\n{document.identifier} has been modified since the last time it was {last_access}.\n"
+            f"I will not change the file\n",
+            style='warning'
+        )
+        interface.await_confirmation()
+        return
+
+    # join builds the new text in one go (chained + would create intermediate copies)
+    document.set_content(''.join(_replaced_pieces(current_text, replacements)))
+
+
 class DocumentModification(Modification):
-    def __init__(self, document: Document, old_text: str, new_text: str):
+    """
+    Replaces ``old_fragment`` at ``start_pos`` with ``new_fragment``.
+
+    Only the changed fragment is stored (not the full old/new texts),
+    which keeps the modification history small for large documents.
+    Fingerprints of the full texts are used to notice other changes to the document.
+    """
+
+    def __init__(self, document: Document, start_pos: int, old_fragment: str, new_fragment: str, old_length: int,
+                 old_fingerprint: bytes, new_fingerprint: bytes):
         self.document = document
-        self.old_text = old_text
-        self.new_text = new_text
+        self.start_pos = start_pos
+        self.old_fragment = old_fragment
+        self.new_fragment = new_fragment
+        self.old_length = old_length
+        self.old_fingerprint = old_fingerprint
+        self.new_fingerprint = new_fingerprint
+
+    @classmethod
+    def from_texts(cls, document: Document, old_text: str, new_text: str) -> 'DocumentModification':
+        """ Creates the modification from the full texts by trimming their common prefix and suffix. """
+        start = common_prefix_length(old_text, new_text)
+        suffix_len = common_suffix_length(old_text, new_text, min(len(old_text), len(new_text)) - start)
+        return cls(
+            document,
+            start_pos=start,
+            old_fragment=old_text[start:len(old_text) - suffix_len],
+            new_fragment=new_text[start:len(new_text) - suffix_len],
+            old_length=len(old_text),
+            old_fingerprint=_fingerprint(old_text),
+            new_fingerprint=_fingerprint(new_text),
+        )
+
+    @classmethod
+    def from_substitution(cls, document: Document, old_text: str, start_pos: int, end_pos: int,
+                          new_str: str) -> 'DocumentModification':
+        """ Creates the modification that replaces ``old_text[start_pos:end_pos]`` with ``new_str``. """
+        old_fragment = old_text[start_pos:end_pos]
+        return cls(
+            document,
+            start_pos=start_pos,
+            old_fragment=old_fragment,
+            new_fragment=new_str,
+            old_length=len(old_text),
+            old_fingerprint=_fingerprint(old_text),
+            new_fingerprint=_fingerprint(*_replaced_pieces(old_text, [(start_pos, old_fragment, new_str)])),
+        )
 
     def apply(self, state: StateType):
-        current_text = self.document.get_content()
-        if current_text != self.old_text:
-            interface.write_text(
-                (f"\n{self.document.identifier} has been modified since the last time it was read.\n"
-                 f"I will not change the file\n"),
-                style='warning'
-            )
-            interface.await_confirmation()
-            return
+        _replace_fragments(
+            self.document, [(self.start_pos, self.old_fragment, self.new_fragment)],
+            self.old_length, self.old_fingerprint, 'read'
+        )
+
+    def unapply(self, state: StateType):
+        _replace_fragments(
+            self.document, [(self.start_pos, self.new_fragment, self.old_fragment)],
+            self.old_length - len(self.old_fragment) + len(self.new_fragment),
+            self.new_fingerprint,
+            'written to'
+        )
+
+
+class BatchedDocumentModification(Modification):
+    """
+    Like ``DocumentModification``, but with several replacements,
+    given as sorted, non-overlapping ``(start_pos, old_fragment, new_fragment)`` triples
+    (positions refer to the old text).
+    """
+
+    def __init__(self, document: Document, replacements: list[tuple[int, str, str]], old_length: int,
+                 old_fingerprint: bytes, new_fingerprint: bytes):
+        self.document = document
+        self.replacements = replacements
+        self.old_length = old_length
+        self.old_fingerprint = old_fingerprint
+        self.new_fingerprint = new_fingerprint
+
+    @classmethod
+    def from_substitutions(cls, document: Document, old_text: str,
+                           substitutions: list[SubstitutionOutcome]) -> 'BatchedDocumentModification':
+        """ ``substitutions`` as in ``BatchedSubstitutionOutcome`` """
+        replacements = [
+            (subst.start_pos, old_text[subst.start_pos:subst.end_pos], subst.new_str)
+            for subst in substitutions
+        ]
+        return cls(
+            document,
+            replacements=replacements,
+            old_length=len(old_text),
+            old_fingerprint=_fingerprint(old_text),
+            new_fingerprint=_fingerprint(*_replaced_pieces(old_text, replacements)),
+        )
 
-        self.document.set_content(self.new_text)
+    def apply(self, state: StateType):
+        _replace_fragments(self.document, self.replacements, self.old_length, self.old_fingerprint, 'read')
 
     def unapply(self, state: StateType):
-        current_text = self.document.get_content()
-        if current_text != self.new_text:
-            interface.write_text(
-                (f"\n{self.document.identifier} has been modified since the last time it was written to.\n"
-                 f"I will not change the file\n"),
-                style='warning'
-            )
-            interface.await_confirmation()
-            return
-        self.document.set_content(self.old_text)
+        # the positions in the new text
+        inverse: list[tuple[int, str, str]] = []
+        shift = 0
+        for start, old_fragment, new_fragment in self.replacements:
+            inverse.append((start + shift, new_fragment, old_fragment))
+            shift += len(new_fragment) - len(old_fragment)
+        _replace_fragments(self.document, inverse, self.old_length + shift, self.new_fingerprint, 'written to')
 
 
 class DocumentModifyingStepper(Stepper[DocumentStepperState]):
+    def prepare_command_outcomes(self, outcomes: Sequence[CommandOutcome]) -> Sequence[CommandOutcome]:
+        # commands often make several substitutions (e.g. an annotation and an import)
+        return super().prepare_command_outcomes(batch_substitutions(outcomes))
+
     def handle_command_outcome(self, outcome: CommandOutcome) -> Optional[Modification]:
         doc = self.state.get_current_document()
 
         if isinstance(outcome, SubstitutionOutcome):
-            return DocumentModification(
-                doc,
-                old_text=doc.get_content(),
-                new_text=doc.get_content()[:outcome.start_pos] + outcome.new_str + doc.get_content()[outcome.end_pos:]
+            return DocumentModification.from_substitution(
+                doc, doc.get_content(), outcome.start_pos, outcome.end_pos, outcome.new_str
             )
+        elif isinstance(outcome, BatchedSubstitutionOutcome):
+            return BatchedDocumentModification.from_substitutions(doc, doc.get_content(), outcome.substitutions)
         elif isinstance(outcome, TextRewriteOutcome):
-            return DocumentModification(
+            return DocumentModification.from_texts(
                 doc,
                 old_text=doc.get_content(),
                 new_text=outcome.new_text
@@ -123,6 +312,7 @@ class DocumentModifyingStepper(Stepper[DocumentStepperState]):
 #######################################################################
 
 
+@functools.cache   # edit commands are created for every step, and the config does not change during a session
 def get_editor(number: int) -> str:
     if number == 1:
         return get_config().get('stextools.general', 'editor', fallback=os.getenv('EDITOR', 'nano'))
@@ -148,12 +338,17 @@ class EditCommand(Command):
 
     def execute(self, call: str) -> Sequence[CommandOutcome]:
         old_content = self.document.get_content()
+        old_stat = self.document.path.stat()
         subprocess.Popen([self.editor, str(self.document.path)]).wait()
-        new_content = self.document.get_content()
-        self.document.on_modified()
-        first_change_pos = 0
-        while first_change_pos < len(old_content) and first_change_pos < len(new_content) and old_content[first_change_pos] == new_content[first_change_pos]:
-            first_change_pos += 1
+        new_stat = self.document.path.stat()
+        if (old_stat.st_mtime_ns, old_stat.st_size) == (new_stat.st_mtime_ns, new_stat.st_size):
+            # file was not saved -> no need to re-read and re-load it (FLAMS reloads are expensive)
+            first_change_pos = len(old_content)
+        else:
+            # reset before reading the new content (otherwise, the file gets read twice)
+            self.document.on_modified()
+            new_content = self.document.get_content()
+            first_change_pos = common_prefix_length(old_content, new_content)
 
         if self.outcome_for_first_changed_pos is not None:
             return self.outcome_for_first_changed_pos(first_change_pos)
@@ -7,6 +7,9 @@ Unlike, e.g. from an lxml DOM.
 
 The whole thing is rather hacky (a DOM solution would be cleaner).
 """
+import functools
+import itertools
+import operator
 from html import unescape
 from html.parser import HTMLParser
 from typing import Optional
@@ -14,6 +17,10 @@ from typing import Optional
 from stextools.utils.linked_str import string_to_lstr, LinkedStr, fixed_range_lstr, concatenate_lstrs
 
 
+# documents typically use only a handful of different entities
+_unescape_entity = functools.lru_cache(maxsize=2**12)(unescape)
+
+
 class MyHtmlParser(HTMLParser):
     def __init__(self, text: str):
         super().__init__()
@@ -33,16 +40,22 @@ class MyHtmlParser(HTMLParser):
         self.resume_depth: Optional[int] = None
 
 
-        self.line_no_to_offset: list[int] = [0]
-        value = 0
-        for line in text.splitlines(keepends=True):
-            value += len(line)
-            self.line_no_to_offset.append(value)
+        # HTMLParser only counts '\n' as a line break (unlike str.splitlines).
+        # Everything here runs in C, which matters for large documents.
+        self.line_no_to_offset: list[int] = list(itertools.accumulate(
+            map(operator.add, map(len, text.split('\n')[:-1]), itertools.repeat(1)),
+            initial=0,
+        ))
 
     def get_offset(self):
         p = self.getpos()
         return self.line_no_to_offset[p[0]-1] + p[1]
 
+    def _find_tag_end(self, offset: int) -> int:
+        """ returns the position of the next '>' (or the end of the text) """
+        pos = self.text.find('>', offset)
+        return len(self.text) if pos == -1 else pos
+
     def handle_starttag(self, tag, attrs):
         d_attrs = dict(attrs)
         if self.resume_depth is None:
@@ -56,25 +69,25 @@ class MyHtmlParser(HTMLParser):
                 self.resume_depth = len(self.tag_stack)
         self.tag_stack.append(tag)
         if tag == 'body' and self.body_start is None:
-            self.body_start = self.get_offset()
-            while self.body_start < len(self.text) and self.text[self.body_start] != '>':
-                self.body_start += 1
-            self.body_start += 1
+            self.body_start = self._find_tag_end(self.get_offset()) + 1
 
 
     def handle_endtag(self, tag):
         if tag == 'math' and self.current_formula_start is not None:
-            formula_end = self.get_offset()
-            while formula_end < len(self.text) and self.text[formula_end] != '>':
-                formula_end += 1
+            formula_end = self._find_tag_end(self.get_offset())
             self.formula_ranges.append((self.current_formula_start, formula_end))
             self.current_formula_start = None
 
-        try:
-            while self.tag_stack.pop() != tag:
-                pass
-        except IndexError:
-            raise RuntimeError(f'Unexpectedly closing tag {tag}')
+        tag_stack = self.tag_stack
+        if tag_stack and tag_stack[-1] == tag:   # the common (well-formed) case
+            tag_stack.pop()
+        else:
+            # unclosed tags are closed implicitly
+            try:
+                idx = len(tag_stack) - 1 - tag_stack[::-1].index(tag)
+            except ValueError:
+                raise RuntimeError(f'Unexpectedly closing tag {tag}')
+            del tag_stack[idx:]
         if self.resume_depth is not None and len(self.tag_stack) <= self.resume_depth:
             self.resume_depth = None
         if tag == 'body' and self.body_end is None:
@@ -88,10 +101,10 @@ class MyHtmlParser(HTMLParser):
 
         start = self.get_offset()
         text = self.text
-        end = start
         # data is already unescaped, so possibly end - start != len(data)
-        while end < len(text) and text[end] != '<':
-            end += 1
+        end = text.find('<', start)
+        if end == -1:
+            end = len(text)
         raw_data = text[start:end]
         if not raw_data.strip():
             return
@@ -108,12 +121,16 @@ class MyHtmlParser(HTMLParser):
                     i += 1
                 else:
                     entity = raw_data[i:stop+1]
-                    unescaped = unescape(entity)
-                    lstrs.append(fixed_range_lstr(unescaped, start + i, stop + 1))
+                    unescaped = _unescape_entity(entity)
+                    lstrs.append(fixed_range_lstr(unescaped, start + i, start + stop + 1))
                     i = stop + 1
             else:
-                lstrs.append(string_to_lstr(raw_data[i], start + i))
-                i += 1
+                # everything up to the next entity can be taken over as one piece
+                next_amp = raw_data.find('&', i)
+                if next_amp == -1:
+                    next_amp = len(raw_data)
+                lstrs.append(string_to_lstr(raw_data[i:next_amp], start + i))
+                i = next_amp
 
         self.annotatable_plaintext_ranges.append(concatenate_lstrs(lstrs, None))
 
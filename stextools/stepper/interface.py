@@ -1,32 +1,32 @@
 """
 User interfaces for the stepper module.
 """
+from __future__ import annotations
+
 import _thread
 import dataclasses
 import functools
+import gzip
 import json
 import shutil
 import subprocess
 import sys
 from abc import ABC, abstractmethod
+from collections import deque
 from contextlib import contextmanager
-from http.server import BaseHTTPRequestHandler, HTTPServer
 from pathlib import Path
 from queue import Queue
-from typing import Literal, Optional, TypeAlias, Callable, Any
+from typing import Literal, Optional, TypeAlias, Callable, Any, TYPE_CHECKING
 
 import click
-from pygments import highlight
-from pygments.formatter import Formatter
-from pygments.formatters.html import HtmlFormatter
-from pygments.formatters.terminal import TerminalFormatter
-from pygments.formatters.terminal256 import TerminalTrueColorFormatter
-from pygments.lexers.html import HtmlLexer
-from pygments.lexers.markup import TexLexer, MarkdownLexer
-from pygments.lexers.special import TextLexer
 
 from stextools.config import get_config
 
+if TYPE_CHECKING:
+    # pygments and http.server are imported lazily (they are only needed for some interfaces/features
+    # and would noticeably slow down the startup)
+    from pygments.formatter import Formatter
+
 _Color: TypeAlias = str | tuple[int, int, int]
 
 HEADER_STYLE_MAP = {
@@ -49,36 +49,75 @@ def _get_lines_around(text: str, start: int, end: int, n_lines: int = 7) -> tupl
     if not 0 <= start <= end < len(text):
         raise ValueError(f"Invalid start/end: {start}/{end} for text of length {len(text)}")
 
+    # Note: find/rfind/count (with start/end arguments) avoid scanning or copying the whole text in Python
     for _ in range(n_lines):
         if start_index > 0:
             start_index -= 1
-        while start_index > 0 and text[start_index - 1] != '\n':
-            start_index -= 1
+        start_index = text.rfind('\n', 0, start_index) + 1
 
     end_index = end
     for _ in range(n_lines):
         if end_index + 1 < len(text):
             end_index += 1
-        while end_index + 1 < len(text) and text[end_index + 1] != '\n':
-            end_index += 1
+        next_newline = text.find('\n', end_index + 1)
+        end_index = len(text) - 1 if next_newline == -1 else next_newline - 1
     end_index += 1
 
-    return text[start_index:start], text[start:end], text[end:end_index], text[:start_index].count('\n') + 1
+    return text[start_index:start], text[start:end], text[end:end_index], text.count('\n', 0, start_index) + 1
 
 
+@functools.cache   # lexers are expensive to create, but can be reused
 def get_pygments_lexer(format):
     if format in {'tex', 'sTeX', 'wdTeX'}:
+        from pygments.lexers.markup import TexLexer
         return TexLexer(stripnl=False, stripall=False, ensurenl=False)
     elif format == 'myst':
+        from pygments.lexers.markup import MarkdownLexer
         return MarkdownLexer(stripnl=False, stripall=False, ensurenl=False)
     elif format == 'txt' or format is None:
+        from pygments.lexers.special import TextLexer
         return TextLexer(stripnl=False, stripall=False, ensurenl=False)
     elif format in {'wdHTML', 'FTML'}:
+        from pygments.lexers.html import HtmlLexer
         return HtmlLexer(stripnl=False, stripall=False, ensurenl=False)
     else:
         raise ValueError(f"Unknown format: {format!r}. Supported formats are 'tex', 'sTeX', 'wdHTML', 'FTML', and 'myst'.")
 
 
+def _highlight_around(before: str, between: str, after: str, lexer, formatter: Formatter) -> tuple[str, str]:
+    """
+    Highlights ``before`` and ``after``.
+    The whole text is lexed at once, which is faster than lexing the parts separately
+    and gives the lexer the full context (e.g. for ``after`` starting in the middle of a math environment).
+    """
+    from pygments import format as pygments_format
+
+    # pygments normalizes line breaks, which we have to take into account for the offsets
+    parts = [part.replace('\r\n', '\n').replace('\r', '\n') for part in (before, between, after)]
+    # ... and drops a leading BOM
+    for i, part in enumerate(parts):
+        if part:
+            if part.startswith('\ufeff'):
+                parts[i] = part[1:]
+            break
+    boundaries = [len(parts[0]), len(parts[0]) + len(parts[1])]
+    segments: list[list[tuple[Any, str]]] = [[], [], []]
+    i = 0
+    pos = 0
+    for ttype, value in lexer.get_tokens(''.join(parts)):
+        # tokens can span across boundaries
+        while i < 2 and pos + len(value) > boundaries[i]:
+            k = boundaries[i] - pos
+            if k:
+                segments[i].append((ttype, value[:k]))
+            value = value[k:]
+            pos += k
+            i += 1
+        segments[i].append((ttype, value))
+        pos += len(value)
+    return pygments_format(segments[0], formatter), pygments_format(segments[2], formatter)
+
+
 class interface:
     """
     This is a hack because I messed up the design of this module.
@@ -197,9 +236,10 @@ class Interface(ABC):
         if isinstance(items, list):
             items = {s: s for s in items}
 
+        keys = list(items)
         self.clear()
         self.write_header('Search')
-        for i, key in enumerate(items):
+        for i, key in enumerate(keys):
             self.write_text(f'[{i}] {key}\n', style='bold')
             self.newline()
         while True:
@@ -208,8 +248,8 @@ class Interface(ABC):
             number = self.get_input().strip()
             if not number:
                 return None
-            if number.isdigit() and int(number) in range(len(items)):
-                return items[list(items.keys())[int(number)]]
+            if number.isdigit() and int(number) in range(len(keys)):
+                return items[keys[int(number)]]
             self.write_text(f'Invalid number: {number!r}. Please try again.\n', style='error')
 
 
@@ -324,15 +364,18 @@ class Interface(ABC):
         line_no = line_no + first_line_number - 1
         last_printed_line_no = None
 
+        # everything is written at once (rather than with a write_text call per line)
+        parts: list[str] = []
         for source, style in [(a, 'default'), (b, 'highlight'), (c, 'default')]:
             for line_no, line in enumerate(source.splitlines(keepends=True), line_no):
                 if show_line_numbers and last_printed_line_no != line_no:
-                    self.write_text(f'{line_no:4} ', style='pale')
+                    parts.append(self.apply_style(f'{line_no:4} ', 'pale'))
                     last_printed_line_no = line_no
-                self.write_text(line, style=style)
+                parts.append(self.apply_style(line, style))
 
             if source.endswith('\n'):
                 line_no += 1
+        self.write_text(''.join(parts), prestyled=True)
 
         if not code.endswith('\n'):
             self.newline()
@@ -347,6 +390,28 @@ def html_escape(text: str) -> str:
     )
 
 
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """ Checks if an Accept-Encoding header value allows gzip (i.e. lists it with a non-zero q-value). """
+    for item in accept_encoding.split(','):
+        coding, *params = item.split(';')
+        if coding.strip().lower() != 'gzip':
+            continue
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+@functools.cache
+def _get_resource(name: str) -> bytes:
+    return (Path(__file__).parent / 'resources' / name).read_bytes()
+
+
 class BrowserInterface(Interface):
     """
         A quick-and-dirty web interface (experimental).
@@ -377,15 +442,20 @@ class BrowserInterface(Interface):
     def __init__(self, port: int = 8080):
         self.port = port
 
-        write_queue: Queue = Queue()
-        self.write_queue: Queue = write_queue
+        # the server only polls the write queue, so a deque suffices (appends/pops are thread-safe)
+        write_queue: deque[BrowserInterface.QueueElement] = deque()
+        self.write_queue = write_queue
         input_queue: Queue = Queue()
         self.input_queue: Queue = input_queue
 
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        from pygments.formatters.html import HtmlFormatter
+
         formatter = HtmlFormatter(style='vs')
         self.formatter = formatter
+        pygments_css = formatter.get_style_defs().encode('utf-8')
 
-        # write_queue.put()
+        # write_queue.append()
 
         class MyHandler(BaseHTTPRequestHandler):
             def log_message(self, format, *args):
@@ -426,15 +496,21 @@ class BrowserInterface(Interface):
 </html>
 '''.encode('utf-8'))
                     case '/fetch':
-                        self.my_header('application/json')
-                        elements = []
-                        while not write_queue.empty():
-                            element = write_queue.get()
+                        elements: list[dict[str, Any]] = []
+                        while True:
+                            try:
+                                element = write_queue.popleft()
+                            except IndexError:
+                                break
                             if isinstance(element, BrowserInterface.HtmlQueueElement):
-                                elements.append({
-                                    'type': 'html',
-                                    'html': element.html,
-                                })
+                                # consecutive writes are sent (and inserted into the page) as a single element
+                                if elements and elements[-1]['type'] == 'html':
+                                    elements[-1]['html'].append(element.html)
+                                else:
+                                    elements.append({
+                                        'type': 'html',
+                                        'html': [element.html],
+                                    })
                             elif isinstance(element, BrowserInterface.InputElement):
                                 elements.append({
                                     'type': 'input',
@@ -445,25 +521,35 @@ class BrowserInterface(Interface):
                                 })
                             else:
                                 raise ValueError(f"Unknown queue element type: {type(element)}")
-                        self.wfile.write(json.dumps({'elements': elements}).encode('utf-8'))
+                        for e in elements:
+                            if e['type'] == 'html':
+                                e['html'] = ''.join(e['html'])
+                        data = json.dumps({'elements': elements}).encode('utf-8')
+                        # highlighted code compresses well (small responses are not worth the effort)
+                        if len(data) > 4096 and _accepts_gzip(self.headers.get('Accept-Encoding', '')):
+                            self.my_header('application/json', content_encoding='gzip')
+                            self.wfile.write(gzip.compress(data, compresslevel=1))
+                        else:
+                            self.my_header('application/json')
+                            self.wfile.write(data)
                     case '/static/browser_interface.js':
                         self.my_header('application/javascript')
-                        with open(Path(__file__).parent / 'resources' / 'browser_interface.js', 'rb') as f:
-                            self.wfile.write(f.read())
+                        self.wfile.write(_get_resource('browser_interface.js'))
                     case '/static/browser_interface.css':
                         self.my_header('text/css')
-                        with open(Path(__file__).parent / 'resources' / 'browser_interface.css', 'rb') as f:
-                            self.wfile.write(f.read())
+                        self.wfile.write(_get_resource('browser_interface.css'))
                     case '/static/pygments.css':
                         self.my_header('text/css')
-                        self.wfile.write(formatter.get_style_defs().encode('utf-8'))
+                        self.wfile.write(pygments_css)
                     case _:
                         self.my_header("text/plain", 404)
                         self.wfile.write(b'Not found')
 
-            def my_header(self, content_type: str, code: int = 200):
+            def my_header(self, content_type: str, code: int = 200, content_encoding: Optional[str] = None):
                 self.send_response(code)
                 self.send_header("Content-type", content_type)
+                if content_encoding:
+                    self.send_header("Content-Encoding", content_encoding)
                 self.end_headers()
 
         server = HTTPServer(('localhost', port), MyHandler)
@@ -481,13 +567,13 @@ class BrowserInterface(Interface):
     def write_text(self, text: str, style: str = 'default', *, prestyled: bool = False):
         if not prestyled:
             text = self.apply_style(text, style)
-        self.write_queue.put(BrowserInterface.HtmlQueueElement(text))
+        self.write_queue.append(BrowserInterface.HtmlQueueElement(text))
 
     def newline(self):
-        self.write_queue.put(BrowserInterface.HtmlQueueElement('<br>\n'))
+        self.write_queue.append(BrowserInterface.HtmlQueueElement('<br>\n'))
 
     def clear(self) -> None:
-        self.write_queue.put(self.ClearScreenElement())
+        self.write_queue.append(self.ClearScreenElement())
 
     @contextmanager
     def big_infopage(self):
@@ -497,7 +583,7 @@ class BrowserInterface(Interface):
         self.clear()
 
     def get_input(self) -> str:
-        self.write_queue.put(self.InputElement())
+        self.write_queue.append(self.InputElement())
         return self.input_queue.get()
 
     def write_header(
@@ -520,10 +606,7 @@ class BrowserInterface(Interface):
             show_line_numbers: bool = True,
             first_line_number: int = 1,
     ):
-        lexer = get_pygments_lexer(format or 'txt')
-
-        def code_format(string: str) -> str:
-            result = highlight(string, lexer, self.formatter)
+        def strip_wrapper(result: str) -> str:
             result = result.strip()
             result = result[len('<div class="highlight"><pre>'):-len('</pre></div>')]
             return result
@@ -531,20 +614,19 @@ class BrowserInterface(Interface):
         a, b, c, line_no = self._code_highlight_prep(code, highlight_range, limit_range)
         line_no = line_no + first_line_number - 1
 
-
-        # formatted_code = code_format(a) + self.apply_style(b, 'highlight') + code_format(c)
-        a_formatted = code_format(a)
+        a_highlighted, c_highlighted = _highlight_around(a, b, c, get_pygments_lexer(format or 'txt'), self.formatter)
+        a_formatted = strip_wrapper(a_highlighted)
         if not a.endswith('\n'):
-            a_formatted = a.rstrip('\n')
+            a_formatted = a_formatted.rstrip('\n')
         b_formatted = '\n'.join(self.apply_style(part, 'highlight') for part in b.splitlines(keepends=False))
-        formatted_code = a_formatted + b_formatted + code_format(c)
+        formatted_code = a_formatted + b_formatted + strip_wrapper(c_highlighted)
 
         result = []
         for i, line in enumerate(formatted_code.splitlines(keepends=True), line_no):
             result.append(self.apply_style(f'{i:4} ', 'pale'))
             result.append(line)
 
-        self.write_queue.put(BrowserInterface.HtmlQueueElement(
+        self.write_queue.append(BrowserInterface.HtmlQueueElement(
             '<span class="code-block"><pre>' + ''.join(result) + '\n</pre></span>'
         ))
 
@@ -565,7 +647,8 @@ class MinimalInterface(Interface):
         self.clear()
 
     def write_text(self, text: str, style: str = 'default', *, prestyled: bool = False):
-        print(text, end='')
+        # not cached, so that redirections of sys.stdout still work (input() flushes it before reading)
+        sys.stdout.write(text)
 
     def get_input(self) -> str:
         return input()
@@ -582,6 +665,67 @@ Potential workaround:
     )
 
 
+@functools.cache   # apply_style is called for every written piece of text
+def _get_console_style_codes(style: str, light_mode: bool, true_color: bool) -> tuple[str, str]:
+    """ returns the ANSI escape codes that go before/after text in the given style """
+    def c(
+            simple: str | None,
+            full: tuple[int, int, int],
+            simple_light: str | None,
+            full_light: tuple[int, int, int],
+    ) -> _Color | None:
+        if light_mode:
+            return full_light if true_color else simple_light
+        return full if true_color else simple
+
+    bold = False
+    italics = False
+    strikethrough = False
+    default_bg = c(None, (0, 0, 0), None, (255, 255, 255))
+    default_fg = c(None, (255, 255, 255), None, (0, 0, 0))
+    bg = default_bg
+    fg = default_fg
+
+    if style == 'bold':
+        bold = True
+    elif style == 'error':
+        bg = c('red', (255, 0, 0), 'bright_red', (255, 128, 128))
+    elif style == 'error-weak':
+        fg = c('bright_red', (255, 128, 128), 'red', (255, 0, 0))
+    elif style == 'success-weak':
+        fg = c('bright_green', (128, 255, 128), 'green', (0, 255, 0))
+    elif style == 'warning':
+        bg = c('yellow', (255, 255, 0), 'bright_yellow', (255, 255, 128))
+    elif style == 'highlight':
+        bg = c('yellow', (255, 255, 0), 'bright_yellow', (255, 255, 0))
+    elif style == 'pale':
+        fg = c('bright_black', (128, 128, 128), 'bright_black', (128, 128, 128))
+    elif style == 'highlight1':
+        bg = c('bright_green', (0, 255, 0), 'bright_green', (128, 255, 128))
+    elif style == 'highlight2':
+        bg = c('bright_cyan', (0, 255, 255), 'bright_cyan', (128, 255, 255))
+    elif style == 'highlight3':
+        bg = c('bright_blue', (0, 0, 255), 'bright_blue', (128, 128, 255))
+    else:
+        pass
+
+    # the escape codes around a (NUL) placeholder
+    prefix, _, suffix = (
+        click.style('\0', bg=bg, fg=fg, bold=bold, italic=italics, strikethrough=strikethrough) +
+        click.style('', bg=default_bg, fg=default_fg, reset=False)
+    ).partition('\0')
+    return prefix, suffix
+
+
+@functools.cache
+def _get_terminal_formatter(style: str, true_color: bool) -> Formatter:
+    if true_color:
+        from pygments.formatters.terminal256 import TerminalTrueColorFormatter
+        return TerminalTrueColorFormatter(style=style)
+    from pygments.formatters.terminal import TerminalFormatter
+    return TerminalFormatter(style=style)
+
+
 @dataclasses.dataclass
 class ConsoleInterface(Interface):
     light_mode: bool = False
@@ -589,7 +733,8 @@ class ConsoleInterface(Interface):
 
     def __post_init__(self):
         self._in_big_infopage: bool = False
-        self._big_infopage_content: str = ''
+        # collected as a list of chunks (repeated string concatenation would be quadratic for large pages)
+        self._big_infopage_content: list[str] = []
 
     def clear(self) -> None:
         click.clear()
@@ -622,8 +767,12 @@ class ConsoleInterface(Interface):
 
         proc = subprocess.Popen([fzf_path, '--ansi'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
         assert proc.stdin is not None
-        proc.stdin.write('\n'.join(items.keys()))
-        proc.stdin.close()
+        # streamed (fzf can start while we are still writing, and we do not need one big string)
+        try:
+            with proc.stdin as f:
+                f.writelines(key + '\n' for key in items)
+        except BrokenPipeError:   # fzf was closed before it read all items
+            pass
         assert proc.stdout is not None
         selected = proc.stdout.read().strip()
         proc.wait()
@@ -647,14 +796,16 @@ class ConsoleInterface(Interface):
         if self._in_big_infopage:
             raise RuntimeError("Already in a big infopage context.")
         self._in_big_infopage = True
-        self._big_infopage_content = ''
+        self._big_infopage_content = []
         yield
         self._in_big_infopage = False
+        # the pager can consume the chunks one by one (no need to join them into a big string first)
         click.echo_via_pager(self._big_infopage_content)
+        self._big_infopage_content = []
 
     def _write_styled(self, text: str):
         if self._in_big_infopage:
-            self._big_infopage_content += text
+            self._big_infopage_content.append(text)
         else:
             click.echo(text, nl=False)
 
@@ -670,49 +821,12 @@ class ConsoleInterface(Interface):
         self.newline()
 
     def apply_style(self, text: str, style: str) -> str:
-        def c(
-                simple: str | None,
-                full: tuple[int, int, int],
-                simple_light: str | None,
-                full_light: tuple[int, int, int],
-        ) -> _Color | None:
-            if self.light_mode:
-                return full_light if self.true_color else simple_light
-            return full if self.true_color else simple
-
-        bold = False
-        italics = False
-        strikethrough = False
-        default_bg = c(None, (0, 0, 0), None, (255, 255, 255))
-        default_fg = c(None, (255, 255, 255), None, (0, 0, 0))
-        bg = default_bg
-        fg = default_fg
-
-        if style == 'bold':
-            bold = True
-        elif style == 'error':
-            bg = c('red', (255, 0, 0), 'bright_red', (255, 128, 128))
-        elif style == 'error-weak':
-            fg = c('bright_red', (255, 128, 128), 'red', (255, 0, 0))
-        elif style == 'success-weak':
-            fg = c('bright_green', (128, 255, 128), 'green', (0, 255, 0))
-        elif style == 'warning':
-            bg = c('yellow', (255, 255, 0), 'bright_yellow', (255, 255, 128))
-        elif style == 'highlight':
-            bg = c('yellow', (255, 255, 0), 'bright_yellow', (255, 255, 0))
-        elif style == 'pale':
-            fg = c('bright_black', (128, 128, 128), 'bright_black', (128, 128, 128))
-        elif style == 'highlight1':
-            bg = c('bright_green', (0, 255, 0), 'bright_green', (128, 255, 128))
-        elif style == 'highlight2':
-            bg = c('bright_cyan', (0, 255, 255), 'bright_cyan', (128, 255, 255))
-        elif style == 'highlight3':
-            bg = c('bright_blue', (0, 0, 255), 'bright_blue', (128, 128, 255))
-        else:
-            pass
-
-        return click.style(text, bg=bg, fg=fg, bold=bold, italic=italics, strikethrough=strikethrough) + \
-            click.style('', bg=default_bg, fg=default_fg, reset=False)
+        if style == 'default' and not self.true_color:
+            # styled text resets everything at the end, so the default style would only add redundant escape codes
+            # (in true color mode, the default colors are set explicitly, though)
+            return text
+        prefix, suffix = _get_console_style_codes(style, self.light_mode, self.true_color)
+        return prefix + text + suffix
 
 
     def get_input(self) -> str:
@@ -731,24 +845,19 @@ class ConsoleInterface(Interface):
         a, b, c, line_no = self._code_highlight_prep(code, highlight_range, limit_range)
         line_no = line_no + first_line_number - 1
 
-        def code_format(string: str) -> str:
-            style = 'vs' if self.light_mode else 'monokai'
-
-            if self.true_color:
-                formatter: Formatter = TerminalTrueColorFormatter(style=style)
-            else:
-                formatter = TerminalFormatter(style=style)
-
-            lexer = get_pygments_lexer(format or 'txt')
-
-            return highlight(string, lexer, formatter)
-
+        a_highlighted, c_highlighted = _highlight_around(
+            a, b, c,
+            get_pygments_lexer(format or 'txt'),
+            _get_terminal_formatter('vs' if self.light_mode else 'monokai', self.true_color),
+        )
         styled_b = '\n'.join(self.apply_style(part, 'highlight') for part in b.splitlines(keepends=False))
-        formatted_code = code_format(a) + styled_b + code_format(c)
+        formatted_code = a_highlighted + styled_b + c_highlighted
 
-        for i, line in enumerate(formatted_code.splitlines(keepends=True), line_no):
-            self.write_text(f'{i:4} ', style='pale')
-            self.write_text(line, prestyled=True)
+        # a single write (click.echo flushes after every call)
+        self.write_text(''.join(
+            self.apply_style(f'{i:4} ', 'pale') + line
+            for i, line in enumerate(formatted_code.splitlines(keepends=True), line_no)
+        ), prestyled=True)
 
         interface.newline()
 
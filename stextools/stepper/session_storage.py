@@ -55,6 +55,8 @@ class Session:
 
 
 class SessionChoiceOutcome(CommandOutcome):
+    __slots__ = ('session_number', 'action')
+
     def __init__(self, session_number: int, action: str):
         self.session_number = session_number
         self.action = action
@@ -127,7 +129,7 @@ class DeleteAllSessionsCommand(Command):
 
 
 class IgnoreSessions(CommandOutcome):
-    pass
+    __slots__ = ()
 
 
 class ContinueWithoutSession(Command):
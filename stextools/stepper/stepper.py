@@ -1,4 +1,5 @@
 from abc import abstractmethod, ABC
+from collections import deque
 from typing import Optional, TypeVar, Generic, Sequence, Literal, TypeAlias
 
 from stextools.stepper.command import CommandCollection, CommandOutcome
@@ -42,13 +43,17 @@ class Stepper(ABC, Generic[StateType]):
     """
     The base class for "ispell-like" functionality.
     """
+
+    # how many steps can be undone/redone (older steps are discarded)
+    max_history_length: int = 150
+
     def __init__(self, state: StateType):
         self.state = state
 
         # a single undoing/redoing may undo/redo multiple modifications
         # (e.g. modify a file and change the cursor position)
-        self.modification_history: list[list[Modification[StateType]]] = []
-        self.modification_future: list[list[Modification[StateType]]] = []
+        self.modification_history: deque[list[Modification[StateType]]] = deque(maxlen=self.max_history_length)
+        self.modification_future: deque[list[Modification[StateType]]] = deque(maxlen=self.max_history_length)
 
     def run(self) -> StopReason:
         """Run the stepper until it is stopped."""
@@ -61,7 +66,9 @@ class Stepper(ABC, Generic[StateType]):
     def _single_iteration(self):
         self.ensure_state_up_to_date()
         self.show_current_state()
-        outcomes: Sequence[CommandOutcome] = self.get_current_command_collection().apply()
+        outcomes: Sequence[CommandOutcome] = self.prepare_command_outcomes(
+            self.get_current_command_collection().apply()
+        )
         new_modifications: list[Modification[StateType]] = []
         for outcome in outcomes:
             assert isinstance(outcome, CommandOutcome)
@@ -75,6 +82,10 @@ class Stepper(ABC, Generic[StateType]):
             self.modification_history.append(new_modifications)
             self.modification_future.clear()
 
+    def prepare_command_outcomes(self, outcomes: Sequence[CommandOutcome]) -> Sequence[CommandOutcome]:
+        """May, e.g., combine outcomes that can be handled more efficiently together."""
+        return outcomes
+
     def ensure_state_up_to_date(self):
         """May do nothing, but could, e.g., update the cursor."""
 
@@ -1,3 +1,4 @@
+import functools
 from copy import deepcopy
 from typing import Optional, Generic
 
@@ -11,7 +12,7 @@ from stextools.stepper.stepper import Stepper, Modification, StateType, StopStep
 #######################################################################
 
 class QuitOutcome(CommandOutcome):
-    pass
+    __slots__ = ()
 
 
 class QuitCommand(Command):
@@ -39,6 +40,8 @@ class QuittableStepper(Stepper[StateType]):
 #######################################################################
 
 class SetCursorOutcome(CommandOutcome, Generic[CursorType]):
+    __slots__ = ('new_cursor',)
+
     def __init__(self, new_cursor: CursorType):
         self.new_cursor = new_cursor
 
@@ -70,23 +73,40 @@ class CursorModifyingStepper(Stepper[StateType]):
 #######################################################################
 
 class UndoOutcome(CommandOutcome):
-    ...
+    __slots__ = ()
 
 
 class RedoOutcome(CommandOutcome):
-    ...
+    __slots__ = ()
+
+
+
+# undo/redo commands are re-created for every step, but there are only two variants of their command info
+
+@functools.cache
+def _get_undo_command_info(is_possible: bool) -> CommandInfo:
+    return CommandInfo(
+        show=False,
+        pattern_presentation='u',
+        description_short='ndo' + ('' if is_possible else ' (currently nothing to undo)'),
+        description_long='Undoes the most recent modification'
+    )
 
 
+@functools.cache
+def _get_redo_command_info(is_possible: bool) -> CommandInfo:
+    return CommandInfo(
+        show=False,
+        pattern_presentation='uu',
+        description_short=' redo ("undo undo")' + ('' if is_possible else ' (currently nothing to redo)'),
+        description_long='Redoes the most recently undone modification'
+    )
+
 
 class UndoCommand(Command):
     def __init__(self, is_possible: bool):
         self.is_possible = is_possible
-        super().__init__(CommandInfo(
-            show=False,
-            pattern_presentation='u',
-            description_short='ndo' + ('' if is_possible else ' (currently nothing to undo)'),
-            description_long='Undoes the most recent modification')
-        )
+        super().__init__(_get_undo_command_info(is_possible))
 
     def execute(self, call: str) -> list[CommandOutcome]:
         if self.is_possible:
@@ -98,12 +118,7 @@ class UndoCommand(Command):
 class RedoCommand(Command):
     def __init__(self, is_possible: bool):
         self.is_possible = is_possible
-        super().__init__(CommandInfo(
-            show=False,
-            pattern_presentation='uu',
-            description_short=' redo ("undo undo")' + ('' if is_possible else ' (currently nothing to redo)'),
-            description_long='Redoes the most recently undone modification')
-        )
+        super().__init__(_get_redo_command_info(is_possible))
 
     def execute(self, call: str) -> list[CommandOutcome]:
         if self.is_possible:
@@ -119,7 +134,7 @@ class UndoableStepper(Stepper[StateType]):
             for mod in reversed(mods):
                 mod.unapply(self.state)
                 self.reset_after_modification(mod)
-                self.modification_future.append(mods)
+            self.modification_future.append(mods)
         elif isinstance(outcome, RedoOutcome):
             mods = self.modification_future.pop()
             for mod in mods:
@@ -165,6 +180,8 @@ class FocusOutcome(CommandOutcome, Modification):
 
 
 class UnfocusOutcome(CommandOutcome):
+    __slots__ = ('stepper', 'focus_state')
+
     def __init__(self, stepper: Stepper[FocussableState]):
         self.stepper = stepper
         self.focus_state = self.stepper.state
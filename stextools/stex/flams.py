@@ -17,6 +17,7 @@ logger = logging.getLogger(__name__)
 class _Flams:
     def __init__(self):
         self._all_files_loaded = False
+        self._modified_files: set[str] = set()   # have to be re-loaded before the next query
         self.ffi = FFI()
         self.ffi.cdef("""
 void hello_world(size_t arg);
@@ -94,7 +95,17 @@ extern size_t FFI_VERSION;
     def hello_world(self, arg: int):
         self.lib.hello_world(arg)
 
+    def mark_modified(self, filepath: str | Path):
+        """ The file will be re-loaded before the next query.
+        Files are often modified repeatedly in a row, so this is cheaper than re-loading them immediately. """
+        self._modified_files.add(str(filepath))
+
+    def _load_modified_files(self):
+        while self._modified_files:
+            self.load_file(self._modified_files.pop())
+
     def load_all_files(self):
+        self._load_modified_files()
         self.lib.load_all_files()
         self._all_files_loaded = True
 
@@ -103,10 +114,14 @@ extern size_t FFI_VERSION;
             self.load_all_files()
 
     def load_file(self, filepath: str | Path):
+        self._modified_files.discard(str(filepath))
         filepath_c = self.ffi.new('char[]', str(filepath).encode('utf-8'))
         self.lib.load_file(filepath_c)
 
     def get_file_annotations(self, filepath: str | Path, load: bool = True):
+        if load:
+            self._modified_files.discard(str(filepath))   # will be loaded anyway
+        self._load_modified_files()
         if load:
             # note: if not explicitly loading, the file may only be partially loaded
             # i.e. some annotations may not be available
@@ -125,11 +140,13 @@ extern size_t FFI_VERSION;
         return None
 
     def get_loaded_files(self) -> list[str]:
+        self._load_modified_files()
         return self._cstr_to_json(self.lib.list_of_loaded_files())
 
     def get_all_files(self, rescan: bool = False) -> list[str]:
         if rescan:
             self.reset_global_backend()
+        self._load_modified_files()
         return self._cstr_to_json(self.lib.list_of_all_files())
 
     def reset_global_backend(self):
@@ -0,0 +1,102 @@
+import unittest
+from contextlib import contextmanager
+from typing import Sequence
+
+from stextools.stepper.command import Command, CommandCollection, CommandInfo, CommandOutcome, SimpleCommandOutcome, \
+    CommandSectionLabel
+from stextools.stepper.interface import Interface, set_interface, MinimalInterface
+
+
+class _ScriptedInterface(Interface):
+    """ Returns pre-defined inputs and discards all output. """
+    def __init__(self, inputs: list[str]):
+        self.inputs = inputs
+
+    def clear(self) -> None:
+        pass
+
+    @contextmanager
+    def big_infopage(self):
+        yield
+
+    def write_text(self, text: str, style: str = 'default', *, prestyled: bool = False):
+        pass
+
+    def get_input(self) -> str:
+        return self.inputs.pop(0)
+
+
+class _NumberCommand(Command):
+    def __init__(self):
+        super().__init__(CommandInfo(
+            pattern_presentation='𝑖',
+            pattern_regex='^[0-9]+$',
+            description_short=' some number',
+        ))
+
+    def execute(self, call: str) -> Sequence[CommandOutcome]:
+        return [SimpleCommandOutcome(call=f'number {call}')]
+
+
+def get_test_collection() -> CommandCollection:
+    return CommandCollection(
+        'test',
+        [
+            Command(CommandInfo(pattern_presentation='q', description_short='uit')),
+            CommandSectionLabel('Section'),
+            None,
+            Command(CommandInfo(pattern_presentation='uu', description_short='redo', show=False)),
+            _NumberCommand(),
+        ],
+    )
+
+
+class TestCommandCollection(unittest.TestCase):
+    def tearDown(self):
+        set_interface(MinimalInterface())
+
+    def test_apply(self):
+        for call, expected in [
+            ('q', 'q'),
+            ('uu', 'uu'),
+            ('42', 'number 42'),
+            ('h', None),
+        ]:
+            with self.subTest(call=call):
+                set_interface(_ScriptedInterface([call]))
+                outcomes = get_test_collection().apply()
+                if expected is None:
+                    self.assertEqual(outcomes, [])
+                else:
+                    self.assertEqual(len(outcomes), 1)
+                    outcome = outcomes[0]
+                    assert isinstance(outcome, SimpleCommandOutcome)
+                    self.assertEqual(outcome.call, expected)
+
+    def test_invalid_command(self):
+        # the invalid command has to be confirmed
+        set_interface(_ScriptedInterface(['u', '']))
+        self.assertEqual(get_test_collection().apply(), [])
+
+    def test_first_matching_command_wins(self):
+        for with_groups in [False, True]:
+            with self.subTest(with_groups=with_groups):
+                set_interface(_ScriptedInterface(['1']))
+                collection = CommandCollection('test', [
+                    Command(CommandInfo(pattern_presentation='x', pattern_regex='^(1|2)$' if with_groups else '^1$',
+                                        description_short='')),
+                    _NumberCommand(),
+                ])
+                outcome = collection.apply()[0]
+                assert isinstance(outcome, SimpleCommandOutcome)
+                self.assertEqual(outcome.call, '1')
+
+    def test_literal_command_does_not_shadow_earlier_commands(self):
+        set_interface(_ScriptedInterface(['1']))
+        collection = CommandCollection('test', [
+            _NumberCommand(),
+            Command(CommandInfo(pattern_presentation='1', description_short='')),
+        ])
+        outcome = collection.apply()[0]
+        assert isinstance(outcome, SimpleCommandOutcome)
+        self.assertEqual(outcome.call, 'number 1')
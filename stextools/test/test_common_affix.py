@@ -0,0 +1,37 @@
+import random
+import unittest
+
+from stextools.utils import common_affix
+from stextools.utils.common_affix import common_prefix_length, common_suffix_length
+
+
+def _naive_prefix_length(a: str, b: str) -> int:
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class TestCommonAffix(unittest.TestCase):
+    def test_simple(self):
+        self.assertEqual(common_prefix_length('hello world', 'hello there'), 6)
+        self.assertEqual(common_prefix_length('abc', 'abc'), 3)
+        self.assertEqual(common_prefix_length('abc', 'abcd'), 3)
+        self.assertEqual(common_prefix_length('', 'abc'), 0)
+        self.assertEqual(common_suffix_length('hello world', 'a world'), 6)
+        self.assertEqual(common_suffix_length('aaa', 'aaaa'), 3)
+        self.assertEqual(common_suffix_length('aaa', 'aaaa', max_length=1), 1)
+
+    def test_random(self):
+        rng = random.Random(0)
+        old_block_size = common_affix._BLOCK_SIZE
+        common_affix._BLOCK_SIZE = 8   # exercise the block logic with short strings
+        try:
+            for _ in range(500):
+                a = ''.join(rng.choice('ab') for _ in range(rng.randrange(40)))
+                b = ''.join(rng.choice('ab') for _ in range(rng.randrange(40)))
+                b = a[:rng.randrange(len(a) + 1)] + b
+                self.assertEqual(common_prefix_length(a, b), _naive_prefix_length(a, b))
+                self.assertEqual(common_suffix_length(a, b), _naive_prefix_length(a[::-1], b[::-1]))
+        finally:
+            common_affix._BLOCK_SIZE = old_block_size
@@ -0,0 +1,186 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+from stextools.stepper.document import STeXDocument, WdAnnoTexDocument, Document, documents_from_paths, \
+    LocalFileDocument, _find_files, _content_cache, WdAnnoHtmlDocument
+from stextools.stex.flams import FLAMS
+
+
+class TestLocalFileDocument(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / 'test.en.tex'
+        self.path.write_text('Hello world\n')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def patch_flams(self) -> list[str]:
+        """ Replaces the FLAMS library for the rest of the test and returns the list of files loaded into it. """
+        loaded: list[str] = []
+        fake_lib = mock.MagicMock()
+        fake_lib.load_file.side_effect = lambda filepath_c: loaded.append(FLAMS.ffi.string(filepath_c).decode())
+        self.enterContext(mock.patch.dict(FLAMS.__dict__, {'lib': fake_lib}))   # ``lib`` is a cached property
+        self.enterContext(mock.patch.object(FLAMS, '_cstr_to_json', return_value=[]))
+        return loaded
+
+    def test_content_is_reread_after_external_modification(self):
+        doc = STeXDocument(self.path, 'en')
+        self.assertEqual(doc.get_content(), 'Hello world\n')
+
+        self.path.write_text('Hello again\n')
+        # make sure the modification time differs, even on file systems with a coarse resolution
+        st = self.path.stat()
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        loaded = self.patch_flams()
+        self.assertEqual(doc.get_content(), 'Hello again\n')
+        # the external modification has to be passed on to FLAMS as well
+        FLAMS.get_loaded_files()
+        self.assertEqual(loaded, [doc.identifier])
+
+    def test_html_offsets_follow_external_modification(self):
+        path = Path(self.tmpdir.name) / 'test.en.html'
+        path.write_text('<html><body><p>hello</p></body></html>')
+        doc = WdAnnoHtmlDocument(path, 'en')
+        self.assertEqual([str(s) for s in doc.get_annotatable_plaintext()], ['hello'])
+
+        new_content = '<html><head><title>t</title></head><body><p>hello</p></body></html>'
+        path.write_text(new_content)
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertEqual(doc.get_body_range(), WdAnnoHtmlDocument(path, 'en').get_body_range())
+        [lstr] = doc.get_annotatable_plaintext()
+        self.assertEqual(new_content[lstr.get_start_ref():lstr.get_end_ref()], 'hello')
+
+    def test_written_content_is_cached(self):
+        doc = STeXDocument(self.path, 'en')
+        doc.write_content('New content\n')
+        self.assertEqual(doc.get_content(), 'New content\n')
+        self.assertEqual(self.path.read_text(), 'New content\n')
+
+    def test_least_recently_used_contents_are_dropped(self):
+        old_max_size = _content_cache.max_size
+        _content_cache.max_size = 2
+        try:
+            docs = []
+            for i in range(3):
+                path = Path(self.tmpdir.name) / f'doc{i}.en.tex'
+                path.write_text(f'Content {i}\n')
+                docs.append(STeXDocument(path, 'en'))
+            docs[0].get_content()
+            docs[1].get_content()
+            docs[0].get_content()
+            docs[2].get_content()
+            self.assertIsNotNone(docs[0]._content)
+            self.assertIsNone(docs[1]._content)
+            self.assertEqual(docs[1].get_content(), 'Content 1\n')
+        finally:
+            _content_cache.max_size = old_max_size
+
+    def test_evicted_html_document_releases_parser(self):
+        old_max_size = _content_cache.max_size
+        _content_cache.max_size = 1
+        try:
+            html_path = Path(self.tmpdir.name) / 'test.en.html'
+            html_path.write_text('<html><body><p>hello</p></body></html>')
+            html_doc = WdAnnoHtmlDocument(html_path, 'en')
+            self.assertEqual([str(s) for s in html_doc.get_annotatable_plaintext()], ['hello'])
+            self.assertIsNotNone(html_doc.html_parser)
+            STeXDocument(self.path, 'en').get_content()
+            self.assertIsNone(html_doc._content)
+            self.assertIsNone(html_doc.html_parser)
+            self.assertEqual([str(s) for s in html_doc.get_annotatable_plaintext()], ['hello'])
+        finally:
+            _content_cache.max_size = old_max_size
+
+    def test_plaintext_follows_content_changes(self):
+        doc: Document = WdAnnoTexDocument(self.path, 'en')
+        self.assertEqual([str(s) for s in doc.get_annotatable_plaintext()], ['Hello world\n'])
+        doc.set_content('Hello \\textbf{there}\n')
+        self.assertEqual([str(s) for s in doc.get_annotatable_plaintext()], ['Hello ', 'there', '\n'])
+        self.assertEqual(str(doc.get_plaintext_approximation()), 'Hello there\n')
+
+    def test_all_annotatable_in_document_order(self):
+        doc = STeXDocument(self.path, 'en')
+        doc.write_content('Let $x$ be \\emph{a number} with $x > 0$.\n')
+        self.assertEqual(
+            [(mode, str(lstr)) for mode, lstr in doc.get_all_annotatable()],
+            [('text', 'Let '), ('math', '$x$'), ('text', ' be '), ('text', 'a number'), ('text', ' with '),
+             ('math', '$x > 0$'), ('text', '.\n')]
+        )
+
+    def test_flams_reload_is_deferred(self):
+        loaded = self.patch_flams()
+        doc = STeXDocument(self.path, 'en')
+        doc.set_content('New content\n')
+        doc.set_content('Newer content\n')
+        self.assertEqual(loaded, [])
+        # the file is re-loaded (once) when FLAMS is queried next
+        FLAMS.get_loaded_files()
+        FLAMS.get_loaded_files()
+        self.assertEqual(loaded, [doc.identifier])
+
+    def test_parsed_nodes_are_shared(self):
+        doc = STeXDocument(self.path, 'en')
+        walker = doc.get_latex_walker()
+        self.assertIs(walker, doc.get_latex_walker())
+        self.assertIs(walker.get_latex_nodes(), walker.get_latex_nodes())
+        doc.write_content('Something else\n')
+        self.assertIsNot(walker, doc.get_latex_walker())
+
+
+class TestDocumentsFromPaths(unittest.TestCase):
+    def test_contents_are_prefetched(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i in range(20):
+                (Path(tmpdir) / f'file{i:02}.en.tex').write_text(f'Content {i}\n')
+            documents = documents_from_paths([Path(tmpdir)], annotation_format='wikidata')
+            self.assertEqual(len(documents), 20)
+            for i, doc in enumerate(sorted(documents, key=lambda d: d.identifier)):
+                assert isinstance(doc, LocalFileDocument)
+                self.assertEqual(doc._content, f'Content {i}\n')
+                self.assertEqual(doc.get_content(), f'Content {i}\n')
+
+    def test_several_directories(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            directories = [Path(tmpdir) / name for name in ['b', 'a', 'c']]
+            for directory in directories:
+                (directory / 'sub').mkdir(parents=True)
+                (directory / 'sub' / 'file.en.tex').write_text('Content\n')
+            documents = documents_from_paths(directories + [directories[0]], annotation_format='wikidata')
+            self.assertEqual(
+                [doc.identifier for doc in documents],
+                [str((directory / 'sub' / 'file.en.tex').resolve()) for directory in directories]
+            )
+
+    def test_stex_artifacts_are_skipped(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            archive = Path(tmpdir) / 'archive'
+            for directory in ['.git', 'source/.flams', 'lib/sub']:
+                (archive / directory).mkdir(parents=True)
+            for file in ['source/a.tex', 'source/.flams/b.tex', 'source/.flams/f.html',
+                         'lib/c.tex', 'lib/d.html', 'lib/sub/e.tex']:
+                (archive / file).write_text('Content\n')
+
+            found = _find_files(archive, ('.tex', '.html'), skip_stex_artifacts=True)
+            self.assertEqual(
+                sorted(str(path.relative_to(archive)) for path in found['.tex'] + found['.html']),
+                ['lib/d.html', 'lib/sub/e.tex', 'source/.flams/f.html', 'source/a.tex']
+            )
+            found = _find_files(archive, ('.tex', '.html'))
+            self.assertEqual(len(found['.tex'] + found['.html']), 6)
+
+            # explicitly passed files and roots are checked as well
+            docs = documents_from_paths([archive / 'lib' / 'c.tex', archive / 'source' / '.flams'])
+            self.assertEqual([doc.identifier for doc in docs], [str(archive.resolve() / 'source' / '.flams' / 'f.html')])
+
+    def test_stex_documents_are_shared(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / 'a.en.tex'
+            path.write_text('Content\n')
+            doc = STeXDocument.get_or_create(path, 'en')
+            self.assertIs(doc, STeXDocument.get_or_create(Path(tmpdir) / 'sub' / '..' / 'a.en.tex', 'en'))
+            self.assertIsNot(doc, STeXDocument.get_or_create(path, 'de'))
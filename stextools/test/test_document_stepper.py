@@ -0,0 +1,108 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from stextools.stepper.document import WdAnnoTexDocument
+from stextools.stepper.command import CommandOutcome
+from stextools.stepper.document_stepper import DocumentModification, DocumentStepperState, DocumentCursor, \
+    SubstitutionOutcome, BatchedSubstitutionOutcome, BatchedDocumentModification, batch_substitutions
+from stextools.stepper.interface import set_interface, MinimalInterface
+from stextools.test.test_command import _ScriptedInterface
+
+
+class TestDocumentModification(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / 'test.en.tex'
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        set_interface(MinimalInterface())
+
+    def test_from_texts(self):
+        for old_text, new_text in [
+            ('abcdef', 'abXdef'),
+            ('abcdef', 'abcdef'),
+            ('abcdef', 'abcabcdef'),
+            ('aaaa', 'aa'),
+            ('', 'new'),
+            ('old', ''),
+        ]:
+            with self.subTest(old_text=old_text, new_text=new_text):
+                self.path.write_text(old_text)
+                doc = WdAnnoTexDocument(self.path, 'en')
+                state = DocumentStepperState(DocumentCursor(0), [doc])
+                modification = DocumentModification.from_texts(doc, old_text, new_text)
+                modification.apply(state)
+                self.assertEqual(doc.get_content(), new_text)
+                modification.unapply(state)
+                self.assertEqual(doc.get_content(), old_text)
+
+    def test_from_substitution(self):
+        self.path.write_text('Let x be a number.')
+        doc = WdAnnoTexDocument(self.path, 'en')
+        state = DocumentStepperState(DocumentCursor(0), [doc])
+        modification = DocumentModification.from_substitution(doc, doc.get_content(), 4, 5, '$x$')
+        modification.apply(state)
+        self.assertEqual(doc.get_content(), 'Let $x$ be a number.')
+        modification.unapply(state)
+        self.assertEqual(doc.get_content(), 'Let x be a number.')
+
+    def test_other_changes_are_noticed(self):
+        self.path.write_text('abcdef')
+        doc = WdAnnoTexDocument(self.path, 'en')
+        state = DocumentStepperState(DocumentCursor(0), [doc])
+        modification = DocumentModification.from_texts(doc, 'abcdef', 'abXdef')
+        modification.apply(state)
+        doc.set_content('abXdeY')   # same length, and the modified range is unchanged
+        set_interface(_ScriptedInterface(['']))   # confirm the warning
+        modification.unapply(state)
+        self.assertEqual(doc.get_content(), 'abXdeY')
+
+
+def _apply_substitutions(text: str, outcomes: list[CommandOutcome]) -> str:
+    for outcome in outcomes:
+        if isinstance(outcome, SubstitutionOutcome):
+            text = text[:outcome.start_pos] + outcome.new_str + text[outcome.end_pos:]
+        else:
+            assert isinstance(outcome, BatchedSubstitutionOutcome)
+            for subst in reversed(outcome.substitutions):
+                text = text[:subst.start_pos] + subst.new_str + text[subst.end_pos:]
+    return text
+
+
+class TestBatchedSubstitutions(unittest.TestCase):
+    def test_random(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            text = ''.join(rng.choice('abc') for _ in range(rng.randrange(20)))
+            outcomes: list[CommandOutcome] = []
+            current = text
+            for _ in range(rng.randrange(5)):
+                start = rng.randrange(len(current) + 1)
+                end = rng.randrange(start, min(start + 3, len(current)) + 1)
+                subst = SubstitutionOutcome(''.join(rng.choice('XY') for _ in range(rng.randrange(3))), start, end)
+                outcomes.append(subst)
+                current = _apply_substitutions(current, [subst])
+            batched = batch_substitutions(outcomes)
+            self.assertLessEqual(len(batched), len(outcomes))
+            self.assertEqual(_apply_substitutions(text, batched), current)
+
+    def test_modification(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / 'test.en.tex'
+            path.write_text('Let x be a number.')
+            doc = WdAnnoTexDocument(path, 'en')
+            state = DocumentStepperState(DocumentCursor(0), [doc])
+            [outcome] = batch_substitutions([
+                SubstitutionOutcome('\\usemodule{m}\n', 0, 0),
+                SubstitutionOutcome('$x$', 18, 19),
+                SubstitutionOutcome('\\sn{number}', 27, 33),
+            ])
+            assert isinstance(outcome, BatchedSubstitutionOutcome)
+            modification = BatchedDocumentModification.from_substitutions(doc, doc.get_content(), outcome.substitutions)
+            modification.apply(state)
+            self.assertEqual(doc.get_content(), '\\usemodule{m}\nLet $x$ be a \\sn{number}.')
+            modification.unapply(state)
+            self.assertEqual(doc.get_content(), 'Let x be a number.')
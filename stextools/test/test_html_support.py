@@ -0,0 +1,42 @@
+import unittest
+
+from stextools.stepper.html_support import MyHtmlParser
+
+
+class TestMyHtmlParser(unittest.TestCase):
+    def test_plaintext_with_entities(self):
+        html = '<html><body><p>caf&eacute; &amp; more & less</p></body></html>'
+        parser = MyHtmlParser(html)
+        parser.feed(html)
+        self.assertEqual(len(parser.annotatable_plaintext_ranges), 1)
+        lstr = parser.annotatable_plaintext_ranges[0]
+        self.assertEqual(str(lstr), 'café & more & less')
+
+        start = html.index('caf')
+        self.assertEqual(lstr.get_start_ref(), start)
+        self.assertEqual(lstr.get_end_ref(), html.index('</p>'))
+        # the entities are linked to their full source range
+        self.assertEqual(lstr[3:4].get_start_ref(), html.index('&eacute;'))
+        self.assertEqual(lstr[3:4].get_end_ref(), html.index('&eacute;') + len('&eacute;'))
+        # and the plain text in between is linked character by character
+        self.assertEqual(lstr[7:11].get_start_ref(), html.index('more'))
+        self.assertEqual(lstr[7:11].get_end_ref(), html.index('more') + 4)
+
+    def test_offsets_with_unusual_line_breaks(self):
+        # str.splitlines would also split at \r and \x0c, but HTMLParser does not
+        html = '<html>\r\n<body>\n<p>a\x0cb\rc</p>\n<p>second</p>\n</body></html>'
+        parser = MyHtmlParser(html)
+        parser.feed(html)
+        self.assertEqual(
+            [(str(lstr), lstr.get_start_ref()) for lstr in parser.annotatable_plaintext_ranges if str(lstr).strip()],
+            [('a\x0cb\rc', html.index('a\x0c')), ('second', html.index('second'))]
+        )
+
+    def test_unclosed_tags(self):
+        html = '<html><head><title>x</title></head><body><div><p>a<b>b</div>text<p>more</p></body></html>'
+        parser = MyHtmlParser(html)
+        parser.feed(html)
+        self.assertEqual([str(lstr) for lstr in parser.annotatable_plaintext_ranges], ['a', 'b', 'text', 'more'])
+        self.assertEqual(parser.tag_stack, [])
+        with self.assertRaises(RuntimeError):
+            MyHtmlParser('</p>').feed('</p>')
@@ -0,0 +1,84 @@
+import random
+import unittest
+
+from pygments.formatters import HtmlFormatter, NullFormatter
+
+from stextools.stepper.interface import _accepts_gzip, _get_lines_around, _highlight_around, get_pygments_lexer
+
+
+def _naive_get_lines_around(text: str, start: int, end: int, n_lines: int) -> tuple[str, str, str, int]:
+    start_index = start
+    for _ in range(n_lines):
+        if start_index > 0:
+            start_index -= 1
+        while start_index > 0 and text[start_index - 1] != '\n':
+            start_index -= 1
+
+    end_index = end
+    for _ in range(n_lines):
+        if end_index + 1 < len(text):
+            end_index += 1
+        while end_index + 1 < len(text) and text[end_index + 1] != '\n':
+            end_index += 1
+    end_index += 1
+
+    return text[start_index:start], text[start:end], text[end:end_index], text[:start_index].count('\n') + 1
+
+
+class TestGetLinesAround(unittest.TestCase):
+    def test_simple(self):
+        text = 'line 1\nline 2\nline 3\nline 4\nline 5\n'
+        self.assertEqual(
+            _get_lines_around(text, 21, 27, n_lines=1),
+            ('line 3\n', 'line 4', '\nline 5', 3),
+        )
+
+    def test_random(self):
+        rng = random.Random(0)
+        for _ in range(1000):
+            text = ''.join(rng.choice('ab\n') for _ in range(rng.randrange(1, 30)))
+            start = rng.randrange(len(text))
+            end = rng.randrange(start, len(text))
+            n_lines = rng.randrange(4)
+            self.assertEqual(
+                _get_lines_around(text, start, end, n_lines),
+                _naive_get_lines_around(text, start, end, n_lines),
+            )
+
+
+class TestHighlightAround(unittest.TestCase):
+    def test_parts_are_preserved(self):
+        lexer = get_pygments_lexer('tex')
+        code = 'Let $x \\in \\mathbb{N}$ be a number.\n\\begin{definition}\r\nand more\n'
+        for start in range(len(code) + 1):
+            for end in range(start, len(code) + 1, 3):
+                before, after = code[:start], code[end:]
+                with self.subTest(start=start, end=end):
+                    self.assertEqual(
+                        _highlight_around(before, code[start:end], after, lexer, NullFormatter()),
+                        (before.replace('\r\n', '\n').replace('\r', '\n'),
+                         after.replace('\r\n', '\n').replace('\r', '\n'))
+                    )
+
+    def test_leading_bom(self):
+        lexer = get_pygments_lexer('tex')
+        self.assertEqual(_highlight_around('\ufeffab\n', 'X', 'cd\n', lexer, NullFormatter()), ('ab\n', 'cd\n'))
+        self.assertEqual(_highlight_around('', '\ufeffX', 'cd\n', lexer, NullFormatter()), ('', 'cd\n'))
+
+    def test_context_is_used(self):
+        lexer = get_pygments_lexer('tex')
+        formatter = HtmlFormatter()
+        # "y$" is only lexed as math if the lexer knows that the math started before
+        _, after = _highlight_around('Let $x', '+', 'y$ be', lexer, formatter)
+        _, after_without_context = _highlight_around('', '', 'y$ be', lexer, formatter)
+        self.assertNotEqual(after, after_without_context)
+
+
+class TestAcceptsGzip(unittest.TestCase):
+    def test_accepts_gzip(self):
+        for header in ['gzip', 'gzip, deflate, br', 'deflate;q=0.5, GZIP;q=0.1', 'gzip ; q=1.0']:
+            with self.subTest(header=header):
+                self.assertTrue(_accepts_gzip(header))
+        for header in ['', 'x-gzip', 'deflate, br', 'gzip;q=0', 'gzip;q=0.000', 'br, gzip;q=invalid']:
+            with self.subTest(header=header):
+                self.assertFalse(_accepts_gzip(header))
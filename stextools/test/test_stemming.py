@@ -0,0 +1,19 @@
+import unittest
+
+from stextools.snify.text_anno.stemming import string_to_stemmed_word_sequence, mystem
+from stextools.utils.linked_str import string_to_lstr
+
+
+class TestStemming(unittest.TestCase):
+    def test_stemmed_word_sequence(self):
+        text = 'The  running\nfoxes (jumped) over-the DAGs'
+        words = string_to_stemmed_word_sequence(string_to_lstr(text), 'en')
+        self.assertEqual(
+            [str(w) for w in words],
+            [mystem(w, 'en') for w in ['The', 'running', 'foxes', 'jumped', 'over', 'the', 'DAGs']],
+        )
+        # the words should still be linked to the original text
+        self.assertEqual(
+            [text[w.get_start_ref():w.get_end_ref()] for w in words],
+            ['The', 'running', 'foxes', 'jumped', 'over', 'the', 'DAGs'],
+        )
@@ -0,0 +1,55 @@
+"""
+Finding the common prefix/suffix of two strings.
+
+Comparing character by character in Python is slow for large documents.
+Instead, we compare blocks with slice comparisons (done in C) and then
+use a binary search to locate the first difference within the differing block.
+"""
+
+_BLOCK_SIZE = 4096
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n:
+        j = min(i + _BLOCK_SIZE, n)
+        if a[i:j] != b[i:j]:
+            break
+        i = j
+    else:
+        return n
+
+    # the first difference is in [i, j)
+    lo, hi = i, j
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def common_suffix_length(a: str, b: str, max_length: int = -1) -> int:
+    """ ``max_length`` can be used to avoid overlaps with the common prefix """
+    la, lb = len(a), len(b)
+    n = min(la, lb) if max_length < 0 else min(la, lb, max_length)
+    i = 0
+    while i < n:
+        j = min(i + _BLOCK_SIZE, n)
+        if a[la - j:la - i] != b[lb - j:lb - i]:
+            break
+        i = j
+    else:
+        return n
+
+    # the first difference (counting from the end) is in [i, j)
+    lo, hi = i, j
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if a[la - mid:la - lo] == b[lb - mid:lb - lo]:
+            lo = mid
+        else:
+            hi = mid
+    return lo
@@ -1,7 +1,7 @@
-from typing import Iterable
+from typing import AbstractSet, Iterable
 
 
-def json_iter(j, ignore_keys: set[str] = set()) -> Iterable:
+def json_iter(j, ignore_keys: AbstractSet[str] = frozenset()) -> Iterable:
     yield j
     if isinstance(j, dict):
         for key, value in j.items():